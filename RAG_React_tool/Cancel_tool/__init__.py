@@ -1,3 +1,4 @@
 from .sql_tool import SQLTool, get_sql_tool
+from .sql_template_cache import SQLTemplateCache
 
-__all__ = ['SQLTool', 'get_sql_tool']
+__all__ = ['SQLTool', 'get_sql_tool', 'SQLTemplateCache']
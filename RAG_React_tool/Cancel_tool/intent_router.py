@@ -0,0 +1,73 @@
+"""
+Intent Router Module
+
+This module classifies well-known reservation requests (PNR status, refund
+status and cancellation) so SQLTool can answer them with fixed parameterized
+statements instead of asking the LLM to write SQL.
+
+A cancel cannot be undone, so a keyword is not enough: the request must parse
+(with cancel_service's /query parser) to an imperative cancel of exactly one
+PNR. "How do I cancel PNR AB1234?" or "Don't cancel PNR AB1234" do not, and
+any other wording that mentions cancelling falls back to the LLM.
+"""
+import re
+from typing import Optional, Tuple
+
+try:
+    from .sql_template_cache import ENTITY_PATTERNS
+except ImportError:
+    from sql_template_cache import ENTITY_PATTERNS
+try:
+    from ..microservices.cancel_service.app.query_parser import parse_query
+except ImportError:
+    from microservices.cancel_service.app.query_parser import parse_query
+
+PNR_PATTERN = ENTITY_PATTERNS[0][1]
+
+REFUND_PATTERN = re.compile(r"\brefund", re.IGNORECASE)
+CANCEL_PATTERN = re.compile(r"\bcancel(?!led\b)", re.IGNORECASE)
+STATUS_PATTERN = re.compile(r"\b(status|details?|booking|cancelled|confirmed)\b", re.IGNORECASE)
+
+# Parameterized statements for each intent; %(pnr)s is bound to the upper-cased PNR.
+# The conditional UPDATE transitions a booking once; no row back means the PNR is
+# unknown or was already cancelled, which the status statement then reports.
+FAST_PATH_QUERIES = {
+    "cancel": (
+        'UPDATE "Flight_reservation" SET "Booking_Status" = \'Cancelled\', "Refund_Status" = \'Refunded\' '
+        'WHERE UPPER("PNR_Number") = %(pnr)s AND LOWER("Booking_Status") <> \'cancelled\' '
+        'RETURNING "PNR_Number", "Booking_Status", "Refund_Status"'
+    ),
+    "refund_status": (
+        'SELECT "PNR_Number", "Booking_Status", "Refund_Status" '
+        'FROM "Flight_reservation" WHERE UPPER("PNR_Number") = %(pnr)s'
+    ),
+    "status": (
+        'SELECT "PNR_Number", "Customer_Name", "Flight_ID", "Airline", "From_City", "To_City", '
+        '"Departure_Time", "Arrival_Time", "Travel_Date", "Booking_Status", "Refund_Status" '
+        'FROM "Flight_reservation" WHERE UPPER("PNR_Number") = %(pnr)s'
+    ),
+}
+
+
+def classify_request(request: str) -> Optional[Tuple[str, str]]:
+    """Classify a request into a fast-path intent.
+
+    Returns:
+        A tuple of (intent, pnr) when the request names exactly one PNR and
+        matches a known intent, otherwise None so the caller falls back to
+        the LLM.
+    """
+    pnrs = {match.group(1).upper() for match in PNR_PATTERN.finditer(request)}
+    if len(pnrs) != 1:
+        return None
+    pnr = pnrs.pop()
+
+    if CANCEL_PATTERN.search(request):
+        # Only an unambiguous request to cancel this one PNR, and nothing else, skips the LLM
+        return ("cancel", pnr) if parse_query(request) == {"cancel": [pnr]} else None
+
+    if REFUND_PATTERN.search(request):
+        return "refund_status", pnr
+    if STATUS_PATTERN.search(request):
+        return "status", pnr
+    return None
@@ -0,0 +1,145 @@
+"""
+SQL Template Cache Module
+
+This module implements the SQLTemplateCache class, which lets SQLTool reuse
+LLM-generated SQL for requests that only differ in their entities (PNR,
+passenger name, flight ID). The request is reduced to a "shape" by replacing
+those entities with placeholders, and the generated SQL is stored as a
+parameterized template that can be executed directly for later requests of
+the same shape.
+"""
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Entity extractors, applied in order. Each value is normalized before it is
+# used as a bind parameter so "pnr ab1234" and "PNR AB1234" share a template.
+ENTITY_PATTERNS = [
+    ("pnr", re.compile(r"\bpnr(?:\s+(?:number|no\.?))?[\s:#]*((?=[A-Za-z]*\d)[A-Za-z0-9]{5,8})\b", re.IGNORECASE), str.upper),
+    ("flight_id", re.compile(r"\bflight(?:\s+(?:id|number|no\.?))?[\s:#]*([A-Za-z0-9]{2}\d{2,4})\b", re.IGNORECASE), str.upper),
+    ("name", re.compile(r"\b(?i:named|passenger|customer|name)[\s:]+([A-Z][a-zA-Z'\-]+(?:\s+[A-Z][a-zA-Z'\-]+)?)"), str.strip),
+]
+
+
+def extract_entities(request: str) -> Tuple[str, Dict[str, str]]:
+    """Split a request into its shape and the entities found in it.
+
+    Returns:
+        A tuple of (shape, params) where shape is the lower-cased request with
+        each entity replaced by ``{entity}`` and params maps entity names to
+        their normalized values.
+    """
+    params: Dict[str, str] = {}
+    shape = request
+    for name, pattern, normalize in ENTITY_PATTERNS:
+        match = pattern.search(shape)
+        if not match:
+            continue
+        params[name] = normalize(match.group(1))
+        shape = shape[:match.start(1)] + "{" + name + "}" + shape[match.end(1):]
+    shape = re.sub(r"[^\w{}]+", " ", shape.lower()).strip()
+    return shape, params
+
+
+def templatize_sql(sql: str, params: Dict[str, str]) -> Optional[str]:
+    """Turn generated SQL into a psycopg2 template with ``%(name)s`` placeholders.
+
+    Every entity must appear in the SQL as a quoted literal; otherwise the SQL
+    cannot be safely reused and None is returned.
+    """
+    if not params or not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    template = sql.replace("%", "%%")
+    for name, value in params.items():
+        literal = re.compile(r"'" + re.escape(value) + r"'", re.IGNORECASE)
+        template, count = literal.subn(f"%({name})s", template)
+        if count == 0:
+            return None
+    return template
+
+
+class SQLTemplateCache:
+    """An LRU cache of parameterized SQL templates keyed by request shape."""
+
+    def __init__(self, max_size: int = 256, version: str = ""):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of templates kept before the least
+                recently used one is evicted
+            version: Fingerprint of the prompt and schema the templates were
+                generated with; changing it empties the cache
+        """
+        self.max_size = max_size
+        self.version = version
+        self._templates: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "uncacheable": 0, "evictions": 0}
+
+    @staticmethod
+    def fingerprint(*parts: str) -> str:
+        """Build a version string from the prompt template and schema text."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def lookup(self, request: str) -> Tuple[Optional[str], Dict[str, str], str]:
+        """Look up a template for the request.
+
+        Returns:
+            A tuple of (template or None, params, shape).
+        """
+        shape, params = extract_entities(request)
+        with self._lock:
+            template = self._templates.get(shape) if params else None
+            if template is not None:
+                self._templates.move_to_end(shape)
+                self._stats["hits"] += 1
+            else:
+                self._stats["misses"] += 1
+        return template, params, shape
+
+    def store(self, shape: str, params: Dict[str, str], sql: str) -> bool:
+        """Store the SQL generated for a request shape, if it can be templatized."""
+        template = templatize_sql(sql, params)
+        with self._lock:
+            if template is None:
+                self._stats["uncacheable"] += 1
+                return False
+            self._templates[shape] = template
+            self._templates.move_to_end(shape)
+            self._stats["stored"] += 1
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drop every template, optionally switching to a new prompt/schema version."""
+        with self._lock:
+            self._templates.clear()
+            if version is not None:
+                self.version = version
+        logger.info(f"SQL template cache invalidated (version={self.version})")
+
+    def ensure_version(self, version: str):
+        """Invalidate the cache if the prompt/schema fingerprint has changed."""
+        if version != self.version:
+            self.invalidate(version)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._templates)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["version"] = self.version
+        return stats
@@ -1,44 +1,95 @@
 import os
-import sqlite3
-import psycopg2
 from typing import Dict, Any, Optional
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 import logging
+import threading
 try:
     from ..config import Config
+    from ..database.sql_backend import create_backend
+    from ..database.result_cache import get_result_cache
+    from ..database.schema_cache import SchemaCache
+    from ..database.query_guard import QueryGuard, QueryRejectedError
+    from ..database.result_pager import format_page, PageTokenStore, PAGE_TOKEN_PATTERN
+    from .sql_template_cache import SQLTemplateCache
+    from .intent_router import classify_request, FAST_PATH_QUERIES
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from config import Config
+    from database.sql_backend import create_backend
+    from database.result_cache import get_result_cache
+    from database.schema_cache import SchemaCache
+    from database.query_guard import QueryGuard, QueryRejectedError
+    from database.result_pager import format_page, PageTokenStore, PAGE_TOKEN_PATTERN
+    from Cancel_tool.sql_template_cache import SQLTemplateCache
+    from Cancel_tool.intent_router import classify_request, FAST_PATH_QUERIES
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Used in the prompt until the live schema has been introspected
+RESERVATION_SCHEMA_FALLBACK = {
+    "Flight_reservation": [
+        (column, "text") for column in (
+            "PNR_Number", "Customer_Name", "Flight_ID", "Airline", "From_City", "To_City",
+            "Departure_Time", "Arrival_Time", "Travel_Date", "Booking_Date",
+            "Booking_Status", "Refund_Status",
+        )
+    ]
+}
+
 
 class SQLTool:
     """A tool for generating and executing SQL queries based on natural language."""
     
-    def __init__(self, db_path: str = None, model_name: str = None, temperature: float = 0.0):
+    def __init__(self, db_path: str = None, model_name: str = None, temperature: float = 0.0,
+                 backend: str = None):
         """Initialize the SQL tool.
         
         Args:
-            db_path: Path to the Postgres database file
+            db_path: Path to the SQLite database file (used by the sqlite backend)
             model_name: Name of the model to use for SQL generation
             temperature: Temperature for the model
+            backend: "postgres" or "sqlite". Defaults to Config.RESERVATION_SQL_BACKEND
         """
         # Use provided path or default to the new location in the database directory
-        #self.db_path = os.path.abspath(db_path or os.path.join(Config.SQL_DB_DIR, "Flight_reservation.db"))
-        #logger.info(f"Using database at: {self.db_path}")
+        self.db_path = os.path.abspath(db_path or os.path.join(Config.SQL_DB_DIR, "Flight_reservation.db"))
+        self.backend = create_backend(
+            backend or Config.RESERVATION_SQL_BACKEND,
+            dbname=Config.pg_dbname,
+            path=self.db_path,
+            mmap_size=Config.SQLITE_MMAP_SIZE,
+        )
+        logger.info(f"Using the {self.backend.name} backend")
         
         self.model_name = model_name or Config.MODEL_NAME
         self.temperature = temperature
         self.llm = self._initialize_llm()
+        self.schema_cache = SchemaCache(
+            Config.pg_dbname,
+            refresh_interval=Config.SCHEMA_REFRESH_INTERVAL,
+            fallback=RESERVATION_SCHEMA_FALLBACK,
+            ignore_tables=("schema_migrations", "cancel_idempotency", "disruption_jobs"),
+            backend=self.backend,
+        )
+        self.schema_cache.refresh()
         self.sql_chain = self._setup_sql_chain()
+        self.page_key_column = "PNR_Number"
+        self.page_tokens = PageTokenStore()
+        self.query_guard = QueryGuard()
+        self.cache_table = "Flight_reservation"
+        self.result_cache = get_result_cache()
+        self.template_cache = SQLTemplateCache(
+            max_size=Config.SQL_TEMPLATE_CACHE_SIZE,
+            version=self._template_cache_version(),
+        )
+        self._routing_lock = threading.Lock()
+        self._routing_stats = {"fast_path": 0, "template_cache": 0, "llm": 0}
     
     def _initialize_llm(self):
         """Initialize the language model."""
@@ -57,16 +108,16 @@ class SQLTool:
     def _setup_sql_chain(self):
         """Set up the SQL generation chain."""
         # Build prompt
-        template = """You are a Postgresql expert. Given an input data, return a syntactically correct Postgresql query to run.
+        template = """You are a {dialect} expert. Given an input data, return a syntactically correct {dialect} query to run.
         Never query for all columns from a table. You must query only the columns needed to answer the question. 
         Wrap each column name in double quotes (") to denote them as delimited identifiers.
-        Pay attention to use only the column names you can see in the "Flight_reservation" table. 
-        The column names in the "Flight_reservation" table are "PNR_Number","Customer_Name","Flight_ID",
-        "Airline","From_City","To_City","Departure_Time","Arrival_Time","Travel_Date","Booking_Date",
-        "Booking_Status","Refund_Status".
+        Pay attention to use only the tables and column names you can see in the schema below.
         Be careful not to query for columns that do not exist. Also, pay attention to which column is in which table.
         Do not return any new columns nor perform aggregation on columns unless specifically asked.
         
+        Schema:
+        {schema}
+        
         Use the following format:
         
         Request: Request here
@@ -76,78 +127,184 @@ class SQLTool:
         SQLQuery:
         """
         
-        prompt = PromptTemplate(input_variables=["Request"], template=template)
+        template = template.replace("{dialect}", self.backend.dialect)
+        self.sql_prompt_template = template
+        prompt = PromptTemplate(input_variables=["schema", "Request"], template=template)
         
-        # Create the SQL generation chain
+        # Create the SQL generation chain; only the tables relevant to the request are rendered
         return (
-            {"Request": RunnablePassthrough()}
+            {"schema": RunnableLambda(self.schema_cache.render), "Request": RunnablePassthrough()}
             | prompt
             | self.llm
             | StrOutputParser()
         )
     
-    def execute_query(self, query: str) -> str:
-        """Execute a SQL query and return the results."""
+    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None, after: Any = None,
+                      guard: bool = False) -> str:
+        """Execute a SQL query and return the results, serving reads from the result cache.
+
+        Complete (untruncated) SELECT results are cached; reads bound to a
+        PNR are scoped to that PNR so a write to it invalidates only them.
+        Any successful write invalidates the entries it may have changed.
+
+        Args:
+            query: SQL to run; may contain ``%(name)s`` placeholders
+            params: Bind parameters for the placeholders, if any
+            after: Keyset value to resume a paged SELECT after
+            guard: Vet the query with the EXPLAIN cost guard before running it
+
+        Raises:
+            QueryRejectedError: If ``guard`` is set and the query fails the cost guard
+        """
+        row_key = (params or {}).get("pnr")
+        if query.strip().upper().startswith(('SELECT', 'WITH')):
+            return self.result_cache.get_or_load(
+                query, [params, after],
+                lambda: self._run_query(query, params, after, guard),
+                table=self.cache_table,
+                row_key=row_key,
+                cacheable=lambda text: not text.startswith("Error executing query") and "[more available" not in text,
+            )
+
+        result = self._run_query(query, params, after, guard)
+        if not result.startswith("Error executing query"):
+            self.result_cache.invalidate(self.cache_table, row_key)
+        return result
+
+    def _run_query(self, query: str, params: Optional[Dict[str, Any]] = None, after: Any = None,
+                   guard: bool = False) -> str:
+        """Execute a SQL query through the tool's backend and return the results.
+
+        SELECTs are read through a server-side cursor (or SQLite's lazy
+        cursor) and capped at Config.SQL_MAX_ROWS rows; truncated results end
+        with a page token.
+
+        Args:
+            query: SQL to run; may contain ``%(name)s`` placeholders
+            params: Bind parameters for the placeholders, if any
+            after: Keyset value to resume a paged SELECT after
+            guard: Vet the query with the EXPLAIN cost guard before running it
+                (Postgres backend only)
+
+        Raises:
+            QueryRejectedError: If ``guard`` is set and the query fails the cost guard
+        """
         try:
-            #conn = sqlite3.connect(self.db_path)
-            conn = psycopg2.connect(
-                dbname = Config.pg_dbname,
-                user = Config.pg_user,
-                password = Config.pg_password,
-                host = Config.pg_host,
-                port = Config.pg_port,
-                )
-            cursor = conn.cursor()
-            cursor.execute(query)
-            
-            if query.strip().upper().startswith(('SELECT', 'PRAGMA')):
-                results = cursor.fetchall()
-                columns = [description[0] for description in cursor.description] if cursor.description else []
-                conn.close()
-                
-                if not results:
-                    return "No results found."
-                    
-                # Format the results as a table
-                formatted_results = []
-                if columns:
-                    formatted_results.append(" | ".join(columns))
-                    formatted_results.append("-" * (sum(len(str(col)) for col in columns) + 3 * (len(columns) - 1)))
-                
-                for row in results:
-                    formatted_results.append(" | ".join(str(value) for value in row))
-                
-                return "\n".join(formatted_results)
-            else:
-                conn.commit()
-                conn.close()
-                return "Query executed successfully."
-                
-        except sqlite3.Error as e:
+            with self.backend.connection() as conn:
+                if guard and self.backend.supports_guard:
+                    self.query_guard.check(conn, query, params)
+
+                if query.strip().upper().startswith(('SELECT', 'WITH')):
+                    page = self.backend.fetch_page(conn, query, params, max_rows=Config.SQL_MAX_ROWS,
+                                                   key_column=self.page_key_column, after=after)
+                    token = self.page_tokens.issue(query, params, page.next_after) if page.next_after is not None else None
+                    return format_page(page, Config.SQL_RESULT_FORMAT, token)
+
+                page = self.backend.execute(conn, query, params)
+                return format_page(page, Config.SQL_RESULT_FORMAT) if page else "Query executed successfully."
+
+        except self.backend.errors as e:
             return f"Error executing query: {str(e)}"
+
+    def fetch_next_page(self, page_token: str) -> str:
+        """Return the page following the one that issued ``page_token``."""
+        state = self.page_tokens.redeem(page_token)
+        if state is None:
+            return "Page token is unknown or has expired; please run the query again."
+        return self.execute_query(state["query"], state["params"], after=state["after"])
     
+    def _generate_sql(self, request: str) -> str:
+        """Ask the LLM for SQL and strip any markdown code fences."""
+        sql_query = self.sql_chain.invoke(request)
+        if "```sql" in sql_query:
+            sql_query = sql_query.split("```sql")[1].split("```")[0].strip()
+        elif "```" in sql_query:
+            sql_query = sql_query.split("```")[1].strip()
+        return sql_query
+
+    def _template_cache_version(self) -> str:
+        """Fingerprint of the prompt and live schema the cached templates depend on."""
+        return SQLTemplateCache.fingerprint(self.sql_prompt_template, self.schema_cache.fingerprint())
+
+    def invalidate_template_cache(self):
+        """Drop cached SQL templates, e.g. after the prompt or schema changed."""
+        self.template_cache.invalidate(self._template_cache_version())
+
+    def _record_route(self, route: str):
+        with self._routing_lock:
+            self._routing_stats[route] += 1
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Return how many requests took the fast path, the template cache or the LLM."""
+        with self._routing_lock:
+            stats = dict(self._routing_stats)
+        total = sum(stats.values())
+        stats["fast_path_ratio"] = stats["fast_path"] / total if total else 0.0
+        return stats
+
+    def _run_fast_path(self, intent: str, pnr: str) -> str:
+        """Answer a classified request with its fixed parameterized statement."""
+        params = {"pnr": pnr}
+        sql_query = FAST_PATH_QUERIES[intent]
+        result = self.execute_query(sql_query, params)
+        if intent == "cancel" and result == "No results found.":
+            # Nothing updated: the PNR is unknown or was already cancelled
+            sql_query = FAST_PATH_QUERIES["refund_status"]
+            status = self.execute_query(sql_query, params)
+            result = ("No reservation found for this PNR." if status == "No results found."
+                      else "Reservation already cancelled.\n" + status)
+        return f"SQL Query: {sql_query}\nParameters: {params}\n\nResult:\n{result}"
+
     def __call__(self, request: str) -> str:
         """Process a natural language request and return the SQL query results."""
         try:
-            # Generate the SQL query
-            sql_query = self.sql_chain.invoke(request)
-            
-            # Clean up the SQL query (remove any markdown code blocks if present)
-            if "```sql" in sql_query:
-                sql_query = sql_query.split("```sql")[1].split("```")[0].strip()
-            elif "```" in sql_query:
-                sql_query = sql_query.split("```")[1].strip()
-            
-            # Execute the query
-            result = self.execute_query(sql_query)
-            
-            # Format the response
-            response = f"SQL Query: {sql_query}\n\nResult:\n{result}"
+            # Follow-up request for the next page of an earlier result
+            token_match = PAGE_TOKEN_PATTERN.search(request)
+            if token_match:
+                return f"Result:\n{self.fetch_next_page(token_match.group(1))}"
+
+            route = classify_request(request)
+            if route is None:
+                # Templates generated against an older schema must not be reused
+                self.template_cache.ensure_version(self._template_cache_version())
+            template, params, shape = (None, {}, "") if route else self.template_cache.lookup(request)
+
+            if route is not None:
+                # Well-known intent: deterministic statement, no LLM call
+                self._record_route("fast_path")
+                response = self._run_fast_path(*route)
+            elif template is not None:
+                # Same request shape seen before: skip the LLM and bind the new entities
+                self._record_route("template_cache")
+                sql_query = template
+                result = self.execute_query(template, params)
+                response = f"SQL Query: {sql_query}\nParameters: {params}\n\nResult:\n{result}"
+            else:
+                self._record_route("llm")
+                attempt_request = request
+                for _ in range(Config.SQL_GUARD_RETRIES + 1):
+                    sql_query = self._generate_sql(attempt_request)
+                    try:
+                        # Execute the query behind the EXPLAIN cost guard
+                        result = self.execute_query(sql_query, guard=True)
+                        break
+                    except QueryRejectedError as e:
+                        result = f"Query rejected by cost guard: {e.reason}"
+                        attempt_request = (
+                            f"{request}\n(A previous query was rejected: {e.reason}. "
+                            'Filter with a selective WHERE clause, e.g. on "PNR_Number", '
+                            "instead of scanning the whole table.)"
+                        )
+
+                if not result.startswith(("Error executing query", "Query rejected")):
+                    self.template_cache.store(shape, params, sql_query)
+
+                # Format the response
+                response = f"SQL Query: {sql_query}\n\nResult:\n{result}"
            
             # Special handling for cancellation
             if "cancelled" in request.lower() or "cancel" in request.lower():
-                response += "\n\nNote: Please confirm the cancellation details above. " \
-                          "Refund will be processed as per the airline's cancellation policy."
+                response += "\n\nNote: Refund will be processed as per the airline's cancellation policy."
             return response
             
         except Exception as e:
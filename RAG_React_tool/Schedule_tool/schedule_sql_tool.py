@@ -1,10 +1,9 @@
 import os
-import sqlite3
 from typing import Dict, Any, Optional
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 import logging
 import sys
 import os
@@ -15,30 +14,65 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from config import Config
+from database.sql_backend import create_backend
+from database.schema_cache import SchemaCache
+from database.result_pager import format_page, PageTokenStore, PAGE_TOKEN_PATTERN
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Used in the prompt until the live schema has been introspected (mirrors
+# database/flight_availability_db/db.py)
+SCHEDULE_SCHEMA_FALLBACK = {
+    "flight_schedule": [
+        ("flight_id", "character varying"), ("from_airport", "character varying"),
+        ("to_airport", "character varying"), ("departure_time", "time"), ("flight_duration", "double precision"),
+        ("arrival_time", "time"), ("from_city", "character varying"), ("to_city", "character varying"),
+        ("from_airport_code", "character varying"), ("to_airport_code", "character varying"),
+        ("from_country", "character varying"), ("to_country", "character varying"),
+        ("departure_days", "character varying"), ("status", "character varying"), ("delay", "character varying"),
+    ]
+}
+
 class ScheduleSQLTool:
     """A tool for generating and executing SQL queries based on natural language."""
     
-    def __init__(self, db_path: str = None, model_name: str = None, temperature: float = 0.0):
+    def __init__(self, db_path: str = None, model_name: str = None, temperature: float = 0.0,
+                 backend: str = None):
         """Initialize the SQL tool.
         
         Args:
-            db_path: Path to the SQLite database file
+            db_path: Path to the SQLite database file (used by the sqlite backend)
             model_name: Name of the model to use for SQL generation
             temperature: Temperature for the model
+            backend: "postgres" or "sqlite". Defaults to Config.SCHEDULE_SQL_BACKEND
         """
         # Use provided path or default to the new location in the database directory
         self.db_path = os.path.abspath(db_path or os.path.join(Config.FLIGHT_AVAILABILITY_DB_DIR, "flight_schedule.db"))
-        logger.info(f"Using database at: {self.db_path}")
+        self.backend = create_backend(
+            backend or Config.SCHEDULE_SQL_BACKEND,
+            dbname=Config.pg_dbname_2,
+            path=self.db_path,
+            mmap_size=Config.SQLITE_MMAP_SIZE,
+        )
+        logger.info(f"Using the {self.backend.name} backend")
         
         self.model_name = model_name or Config.MODEL_NAME
         self.temperature = temperature
         self.llm = self._initialize_llm()
+        self.schema_cache = SchemaCache(
+            Config.pg_dbname_2,
+            refresh_interval=Config.SCHEMA_REFRESH_INTERVAL,
+            fallback=SCHEDULE_SCHEMA_FALLBACK,
+            ignore_tables=("schema_migrations",),
+            backend=self.backend,
+        )
+        self.schema_cache.refresh()
         self.schedule_sql_chain = self._setup_schedule_sql_chain()
+        # flight_schedule's primary key (lower case in Postgres; SQLite ignores case)
+        self.page_key_column = "flight_id"
+        self.page_tokens = PageTokenStore()
     
     def _initialize_llm(self):
         """Initialize the language model."""
@@ -55,7 +89,7 @@ class ScheduleSQLTool:
     def _setup_schedule_sql_chain(self):
         """Set up the SQL generation chain."""
         # Build prompt
-        template = """You are a SQLite expert specialized in airline reservation systems. Your task is to generate syntactically correct SQLite queries based on the user’s natural language request.
+        template = """You are a {dialect} expert specialized in airline reservation systems. Your task is to generate syntactically correct {dialect} queries based on the user’s natural language request.
 
         ### General Guidelines:
         - **Never** select all columns (`SELECT *`). Always select only the columns needed to answer the question.
@@ -71,6 +105,9 @@ class ScheduleSQLTool:
         - You must **not** write or return a query for flight schedule if no valid Flight ID is provided.
         - Do **not** attempt to extract schedules based on origin/destination or date — schedules are accessible **only via Flight ID**.
 
+        ### Schema (the only tables and columns you may use):
+        {schema}
+
         Use the following format:
         
         Request: Request here
@@ -80,58 +117,58 @@ class ScheduleSQLTool:
         SQLQuery:
         """
         
-        prompt = PromptTemplate(input_variables=["Request"], template=template)
+        template = template.replace("{dialect}", self.backend.dialect)
+        prompt = PromptTemplate(input_variables=["schema", "Request"], template=template)
         
-        # Create the SQL generation chain
+        # Create the SQL generation chain; only the tables relevant to the request are rendered
         return (
-            {"Request": RunnablePassthrough()}
+            {"schema": RunnableLambda(self.schema_cache.render), "Request": RunnablePassthrough()}
             | prompt
             | self.llm
             | StrOutputParser()
         )
     
-    def execute_query(self, query: str) -> str:
-        """Execute a SQL query and return the results."""
+    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None, after: Any = None) -> str:
+        """Execute a SQL query through the tool's backend and return the results.
+
+        SELECTs are read through a server-side cursor (or SQLite's lazy
+        cursor) and capped at Config.SQL_MAX_ROWS rows; truncated results end
+        with a page token.
+
+        Args:
+            query: SQL to run; may contain ``%(name)s`` placeholders
+            params: Bind parameters for the placeholders, if any
+            after: Keyset value to resume a paged SELECT after
+        """
         try:
-            conn = psycopg2.connect(
-                dbname = Config.pg_dbname_2,
-                user = Config.pg_user,
-                password = Config.pg_password,
-                host = Config.pg_host,
-                port = Config.pg_port,
-                )
-            cursor = conn.cursor()
-            cursor.execute(query)
-            
-            if query.strip().upper().startswith(('SELECT', 'PRAGMA')):
-                results = cursor.fetchall()
-                columns = [description[0] for description in cursor.description] if cursor.description else []
-                conn.close()
-                
-                if not results:
-                    return "No results found."
-                    
-                # Format the results as a table
-                formatted_results = []
-                if columns:
-                    formatted_results.append(" | ".join(columns))
-                    formatted_results.append("-" * (sum(len(str(col)) for col in columns) + 3 * (len(columns) - 1)))
-                
-                for row in results:
-                    formatted_results.append(" | ".join(str(value) for value in row))
-                
-                return "\n".join(formatted_results)
-            else:
-                conn.commit()
-                conn.close()
-                return "Query executed successfully."
-                
-        except sqlite3.Error as e:
+            with self.backend.connection() as conn:
+                if query.strip().upper().startswith(('SELECT', 'WITH')):
+                    page = self.backend.fetch_page(conn, query, params, max_rows=Config.SQL_MAX_ROWS,
+                                                   key_column=self.page_key_column, after=after)
+                    token = self.page_tokens.issue(query, params, page.next_after) if page.next_after is not None else None
+                    return format_page(page, Config.SQL_RESULT_FORMAT, token)
+
+                page = self.backend.execute(conn, query, params)
+                return format_page(page, Config.SQL_RESULT_FORMAT) if page else "Query executed successfully."
+
+        except self.backend.errors as e:
             return f"Error executing query: {str(e)}"
+
+    def fetch_next_page(self, page_token: str) -> str:
+        """Return the page following the one that issued ``page_token``."""
+        state = self.page_tokens.redeem(page_token)
+        if state is None:
+            return "Page token is unknown or has expired; please run the query again."
+        return self.execute_query(state["query"], state["params"], after=state["after"])
     
     def __call__(self, request: str) -> str:
         """Process a natural language request and return the SQL query results."""
         try:
+            # Follow-up request for the next page of an earlier result
+            token_match = PAGE_TOKEN_PATTERN.search(request)
+            if token_match:
+                return f"Result:\n{self.fetch_next_page(token_match.group(1))}"
+
             # Generate the SQL query
             sql_query = self.schedule_sql_chain.invoke(request)
             
@@ -37,7 +37,41 @@ class Config:
     pg_password = "mlcohort@4"
     pg_host = "13.200.14.155"
     pg_port = 5432
-    
+
+    # Postgresql connection pool (shared by the SQL tools)
+    PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "1"))
+    PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+    PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+    PG_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("PG_POOL_HEALTH_CHECK_INTERVAL", "30"))  # seconds idle before SELECT 1
+    PG_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "5000"))
+
+    # NL-to-SQL template cache (number of request shapes kept)
+    SQL_TEMPLATE_CACHE_SIZE = int(os.getenv("SQL_TEMPLATE_CACHE_SIZE", "256"))
+
+    # SQL tool result paging
+    SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "50"))  # rows per page returned to the agent
+    SQL_RESULT_FORMAT = os.getenv("SQL_RESULT_FORMAT", "columnar")  # "columnar" or "table"
+
+    # EXPLAIN cost guard for LLM-generated SQL
+    SQL_GUARD_MAX_COST = float(os.getenv("SQL_GUARD_MAX_COST", "10000"))
+    SQL_GUARD_MAX_ROWS = float(os.getenv("SQL_GUARD_MAX_ROWS", "1000"))
+    SQL_GUARD_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_GUARD_STATEMENT_TIMEOUT_MS", "3000"))
+    SQL_GUARD_RETRIES = int(os.getenv("SQL_GUARD_RETRIES", "1"))  # regenerations with a hint after a rejection
+
+    # Query result cache ("memory" or "redis")
+    RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+    RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "60"))  # seconds
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Seconds between information_schema refreshes for the SQL tool prompts
+    SCHEMA_REFRESH_INTERVAL = float(os.getenv("SCHEMA_REFRESH_INTERVAL", "600"))
+
+    # SQL tool backends: "postgres", or "sqlite" to serve the tool's .db file read-only in-process
+    RESERVATION_SQL_BACKEND = os.getenv("RESERVATION_SQL_BACKEND", "postgres")
+    SCHEDULE_SQL_BACKEND = os.getenv("SCHEDULE_SQL_BACKEND", "postgres")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))  # bytes memory-mapped
+
     # Database paths
     SQL_DB_DIR = os.path.join(DATABASE_DIR, "sql_db", "data")
     FLIGHT_AVAILABILITY_DB_DIR = os.path.join(DATABASE_DIR, "flight_availability_db", "data")
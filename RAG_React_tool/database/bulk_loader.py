@@ -0,0 +1,299 @@
+"""
+Bulk Loader Module
+
+Streaming CSV loaders for the reservation and flight schedule tables. Rows
+are read, validated and type-converted one at a time, so memory stays
+bounded regardless of file size, and are written either
+
+- to Postgres with a single ``COPY ... FROM STDIN`` fed from the stream, or
+- to SQLite with ``executemany`` over fixed-size batches.
+
+Rows that fail validation are skipped and counted. Each load reports its
+throughput in rows per second.
+
+    python -m database.bulk_loader reservation --target postgres --create --truncate
+    python -m database.bulk_loader schedule --target sqlite --db database/flight_availability_db/data/flight_schedule.db
+"""
+import io
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def to_text(value: str) -> Optional[str]:
+    value = value.strip()
+    return value or None
+
+
+def to_float(value: str) -> float:
+    return float(value.strip())
+
+
+def to_date(value: str) -> str:
+    """Parse the M/D/YYYY and MM-DD-YYYY dates found in the extracts into ISO format."""
+    value = value.strip()
+    for fmt in ("%m/%d/%Y", "%m-%d-%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+def to_time(value: str) -> str:
+    """Parse '11:48 AM' or '6:00' style times into HH:MM:SS."""
+    value = value.strip()
+    for fmt in ("%I:%M %p", "%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt).time().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised time {value!r}")
+
+
+class TableSpec(NamedTuple):
+    """How one CSV maps onto one table."""
+    table: str
+    csv_path: str
+    # (column, CSV header, converter, default used when the CSV lacks the field)
+    columns: List[Tuple[str, str, Callable[[str], Any], Optional[str]]]
+    ddl: str
+
+
+RESERVATION_SPEC = TableSpec(
+    table="Flight_reservation",
+    csv_path=os.path.join(DATABASE_DIR, "sql_db", "data.csv"),
+    columns=[
+        ("PNR_Number", "PNR_Number", to_text, None),
+        ("Customer_Name", "Customer_Name", to_text, None),
+        ("Flight_ID", "Flight_ID", to_text, None),
+        ("Airline", "Airline", to_text, None),
+        ("From_City", "From_City", to_text, None),
+        ("To_City", "To_City", to_text, None),
+        ("Departure_Time", "Departure_Time", to_time, None),
+        ("Arrival_Time", "Arrival_Time", to_time, None),
+        ("Travel_Date", "Travel_Date", to_date, None),
+        ("Booking_Date", "Booking_Date", to_date, None),
+        ("Booking_Status", "Booking_Status", to_text, None),
+        ("Refund_Status", "Refund_Status", to_text, None),
+    ],
+    ddl='''CREATE TABLE IF NOT EXISTS "Flight_reservation" (
+        "PNR_Number" VARCHAR(10),
+        "Customer_Name" VARCHAR(50),
+        "Flight_ID" VARCHAR(50),
+        "Airline" VARCHAR(50),
+        "From_City" VARCHAR(50),
+        "To_City" VARCHAR(50),
+        "Departure_Time" TIME,
+        "Arrival_Time" TIME,
+        "Travel_Date" DATE,
+        "Booking_Date" DATE,
+        "Booking_Status" VARCHAR(20),
+        "Refund_Status" VARCHAR(20)
+    )''',
+)
+
+SCHEDULE_SPEC = TableSpec(
+    table="flight_schedule",
+    csv_path=os.path.join(DATABASE_DIR, "flight_availability_db", "Flight_availability_and_schedule.csv"),
+    columns=[
+        ("flight_id", "Flight ID", to_text, None),
+        ("from_airport", "From airport", to_text, None),
+        ("to_airport", "To airport", to_text, None),
+        ("departure_time", "Departure time", to_time, None),
+        ("flight_duration", "Flight duration", to_float, None),
+        ("arrival_time", "Arrival time", to_time, None),
+        ("from_city", "From city", to_text, None),
+        ("to_city", "To city", to_text, None),
+        ("from_airport_code", "From airport code", to_text, None),
+        ("to_airport_code", "To airport code", to_text, None),
+        ("from_country", "From country", to_text, None),
+        ("to_country", "To country", to_text, None),
+        ("departure_days", "Departure days of week", to_text, None),
+        ("status", "Status", to_text, None),
+        ("delay", "Delay", to_text, "0"),
+    ],
+    ddl='''CREATE TABLE IF NOT EXISTS flight_schedule (
+        flight_id VARCHAR(10) PRIMARY KEY,
+        from_airport VARCHAR(100),
+        to_airport VARCHAR(100),
+        departure_time TIME,
+        flight_duration FLOAT,
+        arrival_time TIME,
+        from_city VARCHAR(50),
+        to_city VARCHAR(50),
+        from_airport_code VARCHAR(5),
+        to_airport_code VARCHAR(5),
+        from_country VARCHAR(50),
+        to_country VARCHAR(50),
+        departure_days VARCHAR(50),
+        status VARCHAR(20),
+        delay VARCHAR(20)
+    )''',
+)
+
+SPECS = {"reservation": RESERVATION_SPEC, "schedule": SCHEDULE_SPEC}
+
+
+class LoadStats:
+    """Counters for one load."""
+
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self) -> "LoadStats":
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} rows loaded, {self.skipped} skipped in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/s)")
+
+
+def iter_rows(spec: TableSpec, csv_path: str = None, stats: LoadStats = None) -> Iterator[Tuple[Any, ...]]:
+    """Stream converted rows from the CSV, skipping (and counting) rows that fail validation."""
+    stats = stats or LoadStats()
+    # utf-8-sig drops the BOM some extracts start with
+    with open(csv_path or spec.csv_path, "r", encoding="utf-8-sig", newline="") as csvfile:
+        reader = csv.DictReader(csvfile)
+        for line_number, row in enumerate(reader, start=2):
+            try:
+                converted = []
+                for _, field, convert, default in spec.columns:
+                    value = row.get(field)
+                    if value is None:
+                        if default is None:
+                            raise ValueError(f"missing field {field!r}")
+                        value = default
+                    converted.append(convert(value))
+            except (ValueError, TypeError) as e:
+                stats.skipped += 1
+                logger.warning(f"Skipping line {line_number}: {str(e)}")
+                continue
+            stats.rows += 1
+            yield tuple(converted)
+
+
+class _CSVStream(io.RawIOBase):
+    """A read-only file object that renders rows as CSV on demand, for COPY FROM STDIN."""
+
+    def __init__(self, rows: Iterator[Tuple[Any, ...]]):
+        self._rows = rows
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = io.StringIO()
+            writer = csv.writer(chunk)
+            batch = list(islice(self._rows, 1000))
+            if not batch:
+                break
+            # COPY's csv format reads an unquoted empty field as NULL
+            writer.writerows(["" if value is None else value for value in row] for row in batch)
+            self._buffer += chunk.getvalue().encode("utf-8")
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _quoted_columns(spec: TableSpec) -> str:
+    return ", ".join(f'"{column}"' for column, _, _, _ in spec.columns)
+
+
+def load_postgres(conn, spec: TableSpec, csv_path: str = None, create: bool = False,
+                  truncate: bool = False) -> LoadStats:
+    """Stream the CSV into Postgres with a single COPY, committing once at the end."""
+    stats = LoadStats()
+    cursor = conn.cursor()
+    if create:
+        cursor.execute(spec.ddl)
+    if truncate:
+        cursor.execute(f'TRUNCATE "{spec.table}"')
+    copy_sql = f'COPY "{spec.table}" ({_quoted_columns(spec)}) FROM STDIN WITH (FORMAT csv)'
+    cursor.copy_expert(copy_sql, _CSVStream(iter_rows(spec, csv_path, stats)), size=1 << 16)
+    conn.commit()
+    return stats.finish()
+
+
+def load_sqlite(conn: sqlite3.Connection, spec: TableSpec, csv_path: str = None, batch_size: int = 5000,
+                create: bool = False, truncate: bool = False) -> LoadStats:
+    """Stream the CSV into SQLite with ``executemany`` over batches of ``batch_size`` rows."""
+    stats = LoadStats()
+    cursor = conn.cursor()
+    if create:
+        cursor.execute(spec.ddl)
+    if truncate:
+        cursor.execute(f'DELETE FROM "{spec.table}"')
+    placeholders = ", ".join("?" for _ in spec.columns)
+    insert_sql = f'INSERT INTO "{spec.table}" ({_quoted_columns(spec)}) VALUES ({placeholders})'
+    rows = iter_rows(spec, csv_path, stats)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        cursor.executemany(insert_sql, batch)
+    conn.commit()
+    return stats.finish()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load a reservation or schedule CSV.")
+    parser.add_argument("dataset", choices=list(SPECS))
+    parser.add_argument("--target", choices=["postgres", "sqlite"], default="postgres")
+    parser.add_argument("--csv", default=None, help="CSV to load (defaults to the shipped extract)")
+    parser.add_argument("--db", default=None, help="SQLite file (sqlite target only)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per SQLite batch")
+    parser.add_argument("--create", action="store_true", help="create the table if it does not exist")
+    parser.add_argument("--truncate", action="store_true", help="empty the table before loading")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    spec = SPECS[args.dataset]
+    if args.target == "sqlite":
+        if not args.db:
+            parser.error("--db is required for the sqlite target")
+        conn = sqlite3.connect(args.db)
+        try:
+            stats = load_sqlite(conn, spec, args.csv, args.batch_size, args.create, args.truncate)
+        finally:
+            conn.close()
+    else:
+        import psycopg2
+        sys.path.append(os.path.dirname(DATABASE_DIR))
+        from config import Config
+        dbname = Config.pg_dbname if args.dataset == "reservation" else Config.pg_dbname_2
+        conn = psycopg2.connect(dbname=dbname, user=Config.pg_user, password=Config.pg_password,
+                                host=Config.pg_host, port=Config.pg_port)
+        try:
+            stats = load_postgres(conn, spec, args.csv, args.create, args.truncate)
+        finally:
+            conn.close()
+    print(f"{spec.table}: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
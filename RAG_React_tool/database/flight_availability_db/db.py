@@ -1,8 +1,11 @@
 import sqlite3
-import csv
+import sys
 import os
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from database.bulk_loader import RESERVATION_SPEC, SCHEDULE_SPEC, load_sqlite
+
 # Get the directory of the current script
 current_dir = Path(__file__).parent
 
@@ -18,59 +21,9 @@ def create_and_insert_data(conn, cursor):
     DROP TABLE IF EXISTS flight_schedule
     ''')
     
-    # Create new table with updated schema
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS flight_schedule (
-        flight_id VARCHAR(10) PRIMARY KEY,
-        from_airport VARCHAR(100),
-        to_airport VARCHAR(100),
-        departure_time TIME,
-        flight_duration FLOAT,
-        arrival_time TIME,
-        from_city VARCHAR(50),
-        to_city VARCHAR(50),
-        from_airport_code VARCHAR(5),
-        to_airport_code VARCHAR(5),
-        from_country VARCHAR(50),
-        to_country VARCHAR(50),
-        departure_days VARCHAR(50),
-        status VARCHAR(20),
-        delay VARCHAR(20)
-    )
-    ''')
-    
-    # Import data from CSV
-    csv_path = current_dir / 'Flight_availability_and_schedule.csv'
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
-        # Prepare data for insertion
-        data = [(
-            row['Flight ID'],
-            row['From airport'].strip(),
-            row['To airport'].strip(),
-            row['Departure time'],
-            float(row['Flight duration']),
-            row['Arrival time'],
-            row['From city'],
-            row['To city'],
-            row['From airport code'].strip(),
-            row['To airport code'].strip(),
-            row['From country'],
-            row['To country'],
-            row['Departure days of week'],
-            row['Status'],
-            row.get('Delay', '0')
-        ) for row in reader]
-        
-        # Insert data
-        cursor.executemany('''
-        INSERT INTO flight_schedule VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', data)
-    
-    # Commit changes
-    conn.commit()
-    print(f"Successfully imported flight schedule data to {db_path}")
+    # Create the table and stream the CSV into it in batches
+    stats = load_sqlite(conn, SCHEDULE_SPEC, create=True)
+    print(f"Successfully imported flight schedule data to {db_path}: {stats}")
 
 def create_and_insert_flight_reservation_data(conn, cursor):
     """Create the Flight_reservation table and import data from CSV"""
@@ -99,33 +52,8 @@ def create_and_insert_flight_reservation_data(conn, cursor):
     
     # Import data from CSV
     csv_path = current_dir / 'Flight_reservation.csv'
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
-        # Prepare data for insertion
-        data = [(
-            row['PNR_Number'],
-            row['Customer_Name'],
-            row['Flight_ID'],
-            row['Airline'],
-            row['From_City'],
-            row['To_City'],
-            row['Departure_Time'],
-            row['Arrival_Time'],
-            row['Travel_Date'],
-            row['Booking_Date'],
-            row['Booking_Status'],
-            row['Refund_Status']
-        ) for row in reader]
-        
-        # Insert data
-        cursor.executemany('''
-        INSERT INTO Flight_reservation VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', data)
-    
-    # Commit changes
-    conn.commit()
-    print(f"Successfully imported Flight_reservation data to {db_path}")
+    stats = load_sqlite(conn, RESERVATION_SPEC, csv_path=str(csv_path))
+    print(f"Successfully imported Flight_reservation data to {db_path}: {stats}")
 
 def check_table_exists(cursor, table_name):
     """Check if a table exists in the database"""
@@ -0,0 +1,377 @@
+"""
+Database Migrations Module
+
+Versioned schema migrations for the Postgres databases behind the SQL tools
+and services (indexes and constraints for the hot lookup paths), with a
+small CLI:
+
+    python -m database.migrations status
+    python -m database.migrations apply [--to VERSION]
+    python -m database.migrations rollback [--to VERSION]
+    python -m database.migrations check
+
+Each migration runs in its own transaction together with its bookkeeping
+row in ``schema_migrations``, so a failed step leaves nothing half-applied.
+``check`` EXPLAINs the hot queries and verifies they can use their index.
+"""
+import sys
+import json
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+try:
+    from ..config import Config
+    from .pg_pool import get_pool
+except (ImportError, ValueError):
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+    from database.pg_pool import get_pool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Logical database name -> Postgres database name
+DATABASES = {
+    "reservation": Config.pg_dbname,
+    "schedule": Config.pg_dbname_2,
+}
+
+MIGRATIONS: List[Dict[str, Any]] = [
+    {
+        "version": 1,
+        "db": "reservation",
+        "description": "Primary key on Flight_reservation.PNR_Number",
+        "up": ['ALTER TABLE "Flight_reservation" ADD CONSTRAINT flight_reservation_pkey PRIMARY KEY ("PNR_Number")'],
+        "down": ['ALTER TABLE "Flight_reservation" DROP CONSTRAINT IF EXISTS flight_reservation_pkey'],
+    },
+    {
+        "version": 2,
+        "db": "reservation",
+        "description": "Case-insensitive unique index for UPPER(PNR_Number) lookups",
+        "up": ['CREATE UNIQUE INDEX IF NOT EXISTS idx_flight_reservation_upper_pnr '
+               'ON "Flight_reservation" (UPPER("PNR_Number"))'],
+        "down": ['DROP INDEX IF EXISTS idx_flight_reservation_upper_pnr'],
+    },
+    {
+        "version": 3,
+        "db": "reservation",
+        "description": "Flight/travel-date and route/travel-date indexes on Flight_reservation",
+        "up": [
+            'CREATE INDEX IF NOT EXISTS idx_flight_reservation_flight_date '
+            'ON "Flight_reservation" ("Flight_ID", "Travel_Date")',
+            'CREATE INDEX IF NOT EXISTS idx_flight_reservation_route_date '
+            'ON "Flight_reservation" ("From_City", "To_City", "Travel_Date")',
+        ],
+        "down": [
+            'DROP INDEX IF EXISTS idx_flight_reservation_route_date',
+            'DROP INDEX IF EXISTS idx_flight_reservation_flight_date',
+        ],
+    },
+    {
+        "version": 4,
+        "db": "schedule",
+        "description": "Route index (from city, to city, departure time) on the schedule tables",
+        "up": [
+            # flight_schedule only exists once the bulk loader has run; the schedule
+            # service reads "Flight_availability_and_schedule"
+            """DO $$
+            BEGIN
+                IF to_regclass('flight_schedule') IS NOT NULL THEN
+                    CREATE INDEX IF NOT EXISTS idx_flight_schedule_route
+                    ON flight_schedule (from_city, to_city, departure_time);
+                END IF;
+                IF to_regclass('"Flight_availability_and_schedule"') IS NOT NULL THEN
+                    CREATE INDEX IF NOT EXISTS idx_flight_availability_route
+                    ON "Flight_availability_and_schedule" ("From_city", "To_city", "Departure_Time");
+                END IF;
+            END;
+            $$""",
+        ],
+        "down": [
+            'DROP INDEX IF EXISTS idx_flight_availability_route',
+            'DROP INDEX IF EXISTS idx_flight_schedule_route',
+        ],
+    },
+    {
+        "version": 5,
+        "db": "schedule",
+        "description": "NOTIFY schedule_changes on every change to the schedule tables",
+        "up": [
+            # The whole row travels in the payload, so listeners need no follow-up
+            # query; unchanged UPDATEs are not announced
+            """CREATE OR REPLACE FUNCTION notify_schedule_change() RETURNS trigger AS $$
+            DECLARE
+                changed RECORD;
+            BEGIN
+                IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+                    RETURN NULL;
+                END IF;
+                changed := CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END;
+                PERFORM pg_notify('schedule_changes', json_build_object(
+                    'op', TG_OP,
+                    'table', TG_TABLE_NAME,
+                    'ts', extract(epoch FROM clock_timestamp()),
+                    'row', row_to_json(changed)
+                )::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql""",
+            """DO $$
+            DECLARE
+                schedule_table TEXT;
+            BEGIN
+                -- flight_schedule, and the schedule service's table where it exists
+                FOREACH schedule_table IN ARRAY ARRAY['flight_schedule', 'Flight_availability_and_schedule'] LOOP
+                    IF to_regclass(quote_ident(schedule_table)) IS NOT NULL THEN
+                        EXECUTE format('DROP TRIGGER IF EXISTS schedule_change_notify ON %I', schedule_table);
+                        EXECUTE format('CREATE TRIGGER schedule_change_notify '
+                                       'AFTER INSERT OR UPDATE OR DELETE ON %I '
+                                       'FOR EACH ROW EXECUTE FUNCTION notify_schedule_change()', schedule_table);
+                    END IF;
+                END LOOP;
+            END;
+            $$""",
+        ],
+        "down": [
+            """DO $$
+            DECLARE
+                schedule_table TEXT;
+            BEGIN
+                FOREACH schedule_table IN ARRAY ARRAY['flight_schedule', 'Flight_availability_and_schedule'] LOOP
+                    IF to_regclass(quote_ident(schedule_table)) IS NOT NULL THEN
+                        EXECUTE format('DROP TRIGGER IF EXISTS schedule_change_notify ON %I', schedule_table);
+                    END IF;
+                END LOOP;
+            END;
+            $$""",
+            'DROP FUNCTION IF EXISTS notify_schedule_change()',
+        ],
+    },
+    {
+        "version": 6,
+        "db": "reservation",
+        "description": "Idempotency-key dedupe table for cancellations",
+        "up": [
+            """CREATE TABLE IF NOT EXISTS cancel_idempotency (
+                key TEXT PRIMARY KEY,
+                pnr TEXT NOT NULL,
+                response JSONB NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )""",
+            'CREATE INDEX IF NOT EXISTS idx_cancel_idempotency_created_at ON cancel_idempotency (created_at)',
+        ],
+        "down": ['DROP TABLE IF EXISTS cancel_idempotency'],
+    },
+    {
+        "version": 7,
+        "db": "reservation",
+        "description": "Checkpoint table for resumable bulk disruption cancellations",
+        "up": [
+            """CREATE TABLE IF NOT EXISTS disruption_jobs (
+                job_id TEXT PRIMARY KEY,
+                flight_id TEXT NOT NULL,
+                travel_date TEXT,
+                status TEXT NOT NULL,
+                last_pnr TEXT NOT NULL DEFAULT '',
+                cancelled INTEGER NOT NULL DEFAULT 0,
+                batches INTEGER NOT NULL DEFAULT 0,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )""",
+        ],
+        "down": ['DROP TABLE IF EXISTS disruption_jobs'],
+    },
+]
+
+# Hot queries and the index each one is expected to use; a query whose table
+# does not exist in this deployment is skipped
+HOT_QUERIES = [
+    {
+        "db": "reservation",
+        "name": "reservation by PNR",
+        "table": '"Flight_reservation"',
+        "sql": 'SELECT * FROM "Flight_reservation" WHERE UPPER("PNR_Number") = %s',
+        "params": ("AB1234",),
+        "index": "idx_flight_reservation_upper_pnr",
+    },
+    {
+        "db": "reservation",
+        "name": "reservations by flight",
+        "table": '"Flight_reservation"',
+        "sql": 'SELECT "PNR_Number" FROM "Flight_reservation" WHERE "Flight_ID" = %s',
+        "params": ("SG479",),
+        "index": "idx_flight_reservation_flight_date",
+    },
+    {
+        "db": "schedule",
+        "name": "flights by route",
+        "table": "flight_schedule",
+        "sql": "SELECT * FROM flight_schedule WHERE from_city = %s AND to_city = %s ORDER BY departure_time",
+        "params": ("Delhi", "Mumbai"),
+        "index": "idx_flight_schedule_route",
+    },
+    {
+        "db": "schedule",
+        "name": "service flights by route",
+        "table": '"Flight_availability_and_schedule"',
+        "sql": 'SELECT * FROM "Flight_availability_and_schedule" '
+               'WHERE "From_city" = %s AND "To_city" = %s ORDER BY "Departure_Time"',
+        "params": ("Delhi", "Mumbai"),
+        "index": "idx_flight_availability_route",
+    },
+]
+
+
+def _ensure_migrations_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(db: str) -> List[int]:
+    """Return the migration versions recorded as applied in one database."""
+    with get_pool(DATABASES[db]).connection() as conn:
+        _ensure_migrations_table(conn)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT version FROM {MIGRATIONS_TABLE} ORDER BY version")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _run(migration: Dict[str, Any], direction: str):
+    """Run one migration's statements and its bookkeeping row in a single transaction."""
+    with get_pool(DATABASES[migration["db"]]).connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # Index builds may legitimately outlast the pool's statement_timeout
+            cursor.execute("SET LOCAL statement_timeout = 0")
+            for statement in migration[direction]:
+                cursor.execute(statement)
+            if direction == "up":
+                cursor.execute(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (%s, %s)",
+                    (migration["version"], migration["description"]),
+                )
+            else:
+                cursor.execute(f"DELETE FROM {MIGRATIONS_TABLE} WHERE version = %s", (migration["version"],))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def apply(to_version: Optional[int] = None, db: Optional[str] = None) -> List[int]:
+    """Apply pending migrations in version order, up to and including ``to_version``."""
+    done = {name: set(applied_versions(name)) for name in DATABASES if db in (None, name)}
+    ran = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+        if migration["db"] not in done:
+            continue
+        if to_version is not None and migration["version"] > to_version:
+            break
+        if migration["version"] in done[migration["db"]]:
+            continue
+        logger.info(f"Applying {migration['version']}: {migration['description']}")
+        _run(migration, "up")
+        ran.append(migration["version"])
+    return ran
+
+
+def rollback(to_version: Optional[int] = None, db: Optional[str] = None) -> List[int]:
+    """Roll back applied migrations newest first. With ``to_version`` every migration
+    above it is rolled back; without it only the most recent one is."""
+    done = {name: set(applied_versions(name)) for name in DATABASES if db in (None, name)}
+    candidates = [
+        m for m in sorted(MIGRATIONS, key=lambda m: m["version"], reverse=True)
+        if m["db"] in done and m["version"] in done[m["db"]]
+    ]
+    if to_version is None:
+        candidates = candidates[:1]
+    else:
+        candidates = [m for m in candidates if m["version"] > to_version]
+    for migration in candidates:
+        logger.info(f"Rolling back {migration['version']}: {migration['description']}")
+        _run(migration, "down")
+    return [m["version"] for m in candidates]
+
+
+def _plan_indexes(plan: Dict[str, Any]) -> List[str]:
+    """Collect every index name used anywhere in an EXPLAIN JSON plan."""
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        names.extend(_plan_indexes(child))
+    return names
+
+
+def check(db: Optional[str] = None) -> bool:
+    """EXPLAIN each hot query and report whether its expected index is used.
+
+    Sequential scans are disabled for the check so tables that are still
+    small enough for the planner to prefer a scan are judged on whether the
+    index is *usable*, not on today's row counts.
+    """
+    ok = True
+    for query in HOT_QUERIES:
+        if db not in (None, query["db"]):
+            continue
+        with get_pool(DATABASES[query["db"]]).connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT to_regclass(%s)", (query["table"],))
+            if cursor.fetchone()[0] is None:
+                print(f"[SKIP] {query['name']}: table {query['table']} does not exist")
+                continue
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query["sql"], query["params"])
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        used = _plan_indexes(plan[0]["Plan"])
+        passed = query["index"] in used
+        ok = ok and passed
+        print(f"[{'OK' if passed else 'FAIL'}] {query['name']}: expected {query['index']}, plan uses {used or 'no index'}")
+    return ok
+
+
+def status(db: Optional[str] = None):
+    """Print every known migration and whether it is applied."""
+    for name in DATABASES:
+        if db not in (None, name):
+            continue
+        done = set(applied_versions(name))
+        for migration in MIGRATIONS:
+            if migration["db"] == name:
+                mark = "applied" if migration["version"] in done else "pending"
+                print(f"{migration['version']:>4}  {name:<12} {mark:<8} {migration['description']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Apply or roll back database migrations.")
+    parser.add_argument("command", choices=["status", "apply", "rollback", "check"])
+    parser.add_argument("--to", type=int, default=None, help="target version")
+    parser.add_argument("--db", choices=list(DATABASES), default=None, help="limit to one database")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        status(args.db)
+    elif args.command == "apply":
+        ran = apply(args.to, args.db)
+        print(f"Applied: {ran or 'nothing to do'}")
+    elif args.command == "rollback":
+        undone = rollback(args.to, args.db)
+        print(f"Rolled back: {undone or 'nothing to do'}")
+    elif args.command == "check":
+        return 0 if check(args.db) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
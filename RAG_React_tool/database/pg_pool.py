@@ -0,0 +1,227 @@
+"""
+Postgres Connection Pool Module
+
+This module provides a process-wide pool of psycopg2 connections shared by
+the SQL tools, so each tool call reuses an open connection instead of paying
+a TCP + auth handshake per query.
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+try:
+    from ..config import Config
+except (ImportError, ValueError):
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+class PgConnectionPool:
+    """A bounded, health-checked pool of Postgres connections for one database."""
+
+    def __init__(
+        self,
+        dbname: str,
+        min_size: int = None,
+        max_size: int = None,
+        timeout: float = None,
+        health_check_interval: float = None,
+        statement_timeout_ms: int = None,
+    ):
+        """Initialize the pool.
+
+        Args:
+            dbname: Name of the Postgres database to connect to
+            min_size: Connections opened eagerly. Defaults to Config.PG_POOL_MIN_SIZE
+            max_size: Upper bound on open connections. Defaults to Config.PG_POOL_MAX_SIZE
+            timeout: Seconds to wait for a free connection. Defaults to Config.PG_POOL_TIMEOUT
+            health_check_interval: Seconds a connection may sit idle before it is
+                verified with ``SELECT 1`` on checkout
+            statement_timeout_ms: ``statement_timeout`` applied to every connection
+        """
+        self.dbname = dbname
+        self.min_size = min_size if min_size is not None else Config.PG_POOL_MIN_SIZE
+        self.max_size = max_size if max_size is not None else Config.PG_POOL_MAX_SIZE
+        self.timeout = timeout if timeout is not None else Config.PG_POOL_TIMEOUT
+        self.health_check_interval = (
+            health_check_interval if health_check_interval is not None
+            else Config.PG_POOL_HEALTH_CHECK_INTERVAL
+        )
+        self.statement_timeout_ms = (
+            statement_timeout_ms if statement_timeout_ms is not None
+            else Config.PG_STATEMENT_TIMEOUT_MS
+        )
+
+        # ThreadedConnectionPool raises instead of blocking when exhausted, so a
+        # semaphore sized to max_size provides the wait-with-timeout behaviour.
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "health_check_failures": 0,
+        }
+
+        logger.info(
+            f"Creating Postgres pool for '{dbname}' "
+            f"(min={self.min_size}, max={self.max_size}, statement_timeout={self.statement_timeout_ms}ms)"
+        )
+        self._pool = pg_pool.ThreadedConnectionPool(
+            self.min_size,
+            self.max_size,
+            dbname=dbname,
+            user=Config.pg_user,
+            password=Config.pg_password,
+            host=Config.pg_host,
+            port=Config.pg_port,
+            options=f"-c statement_timeout={self.statement_timeout_ms}",
+        )
+
+    def _acquire_slot(self):
+        """Block until a pool slot is free, recording saturation metrics."""
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            self._stats["waits"] += 1
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats["wait_time_total"] += waited
+            if not acquired:
+                self._stats["timeouts"] += 1
+        if not acquired:
+            logger.warning(f"Postgres pool '{self.dbname}' saturated; waited {waited:.3f}s")
+            raise PoolTimeoutError(
+                f"No free connection in pool '{self.dbname}' after {self.timeout}s"
+            )
+
+    def _is_healthy(self, conn) -> bool:
+        """Return True if the connection is usable, probing it if it has been idle."""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection. Pair every call with ``putconn``."""
+        self._acquire_slot()
+        try:
+            conn = self._pool.getconn()
+            if not self._is_healthy(conn):
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                logger.warning(f"Discarding broken connection from pool '{self.dbname}'")
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        try:
+            close = bool(conn.closed)
+            if not close:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+            if close:
+                self._last_used.pop(id(conn), None)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection.
+
+        Uncommitted work is rolled back when the block exits, so callers that
+        write must call ``conn.commit()`` themselves.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage and saturation metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["dbname"] = self.dbname
+        stats["max_size"] = self.max_size
+        stats["saturation"] = stats["in_use"] / self.max_size if self.max_size else 0.0
+        return stats
+
+    def close(self):
+        """Close every connection held by the pool."""
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+_pools: Dict[str, PgConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dbname: str) -> PgConnectionPool:
+    """Return the process-wide pool for ``dbname``, creating it on first use."""
+    pg = _pools.get(dbname)
+    if pg is None:
+        with _pools_lock:
+            pg = _pools.get(dbname)
+            if pg is None:
+                pg = PgConnectionPool(dbname)
+                _pools[dbname] = pg
+    return pg
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Return metrics for every pool created in this process, keyed by database name."""
+    return {dbname: pg.get_stats() for dbname, pg in list(_pools.items())}
+
+
+def close_all_pools(dbname: Optional[str] = None):
+    """Close one pool, or all pools when ``dbname`` is None."""
+    with _pools_lock:
+        names = [dbname] if dbname is not None else list(_pools)
+        for name in names:
+            pg = _pools.pop(name, None)
+            if pg is not None:
+                pg.close()
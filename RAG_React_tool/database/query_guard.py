@@ -0,0 +1,129 @@
+"""
+Query Guard Module
+
+This module implements the QueryGuard class, which vets LLM-generated SQL
+before it runs: the statement is EXPLAINed on the connection that will run
+it, and it is rejected if the planner's estimated cost or row count is over
+the configured limits, or if it is an UPDATE/DELETE without a WHERE clause.
+"""
+import re
+import json
+import logging
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+try:
+    from ..config import Config
+except (ImportError, ValueError):
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+_UNBOUNDED_WRITE = re.compile(r"^\s*(UPDATE|DELETE)\b(?!.*\bWHERE\b)", re.IGNORECASE | re.DOTALL)
+
+
+class QueryRejectedError(Exception):
+    """Raised when a generated query fails the cost guard."""
+
+    def __init__(self, reason: str, cost: Optional[float] = None, rows: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.cost = cost
+        self.rows = rows
+
+
+class PlanEstimate(NamedTuple):
+    """Planner estimates for a statement."""
+    cost: float
+    rows: float
+
+
+class QueryGuard:
+    """Rejects statements whose EXPLAIN estimates exceed cost or row limits."""
+
+    def __init__(self, max_cost: float = None, max_rows: float = None, statement_timeout_ms: int = None):
+        """
+        Initialize the guard.
+
+        Args:
+            max_cost: Highest planner total cost allowed. Defaults to Config.SQL_GUARD_MAX_COST
+            max_rows: Highest estimated row count allowed. Defaults to Config.SQL_GUARD_MAX_ROWS
+            statement_timeout_ms: ``statement_timeout`` set for the guarded
+                statement's transaction. Defaults to Config.SQL_GUARD_STATEMENT_TIMEOUT_MS
+        """
+        self.max_cost = max_cost if max_cost is not None else Config.SQL_GUARD_MAX_COST
+        self.max_rows = max_rows if max_rows is not None else Config.SQL_GUARD_MAX_ROWS
+        self.statement_timeout_ms = (
+            statement_timeout_ms if statement_timeout_ms is not None
+            else Config.SQL_GUARD_STATEMENT_TIMEOUT_MS
+        )
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "rejected": 0, "explained": 0, "cost_total": 0.0, "cost_max": 0.0}
+
+    def explain(self, conn, query: str, params: Optional[Dict[str, Any]] = None) -> PlanEstimate:
+        """Return the planner's cost and row estimates without running the statement."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query.strip().rstrip(";"), params)
+            plan = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        return PlanEstimate(float(root["Total Cost"]), float(root["Plan Rows"]))
+
+    def check(self, conn, query: str, params: Optional[Dict[str, Any]] = None) -> PlanEstimate:
+        """Vet a statement and apply the guard's statement timeout to the current transaction.
+
+        Raises:
+            QueryRejectedError: If the statement is an unbounded write or its
+                estimates exceed the configured limits
+        """
+        if _UNBOUNDED_WRITE.search(query):
+            self._record(None, rejected=True)
+            logger.warning("Cost guard rejected UPDATE/DELETE without WHERE clause")
+            raise QueryRejectedError("UPDATE/DELETE statements must have a WHERE clause")
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}")
+        finally:
+            cursor.close()
+
+        estimate = self.explain(conn, query, params)
+        reason = None
+        if estimate.cost > self.max_cost:
+            reason = f"estimated cost {estimate.cost:.0f} exceeds limit {self.max_cost:.0f}"
+        elif estimate.rows > self.max_rows:
+            reason = f"estimated {estimate.rows:.0f} rows exceeds limit {self.max_rows:.0f}"
+
+        self._record(estimate.cost, rejected=reason is not None)
+        logger.info(
+            f"Cost guard: cost={estimate.cost:.1f} rows={estimate.rows:.0f} "
+            f"{'rejected' if reason else 'accepted'}"
+        )
+        if reason:
+            raise QueryRejectedError(reason, estimate.cost, estimate.rows)
+        return estimate
+
+    def _record(self, cost: Optional[float], rejected: bool):
+        with self._lock:
+            self._stats["checked"] += 1
+            if rejected:
+                self._stats["rejected"] += 1
+            if cost is not None:
+                self._stats["explained"] += 1
+                self._stats["cost_total"] += cost
+                self._stats["cost_max"] = max(self._stats["cost_max"], cost)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counts of checked/rejected statements and plan cost aggregates."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["rejection_rate"] = stats["rejected"] / stats["checked"] if stats["checked"] else 0.0
+        stats["cost_avg"] = stats["cost_total"] / stats["explained"] if stats["explained"] else 0.0
+        return stats
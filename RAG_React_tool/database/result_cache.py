@@ -0,0 +1,295 @@
+"""
+Result Cache Module
+
+This module implements a read-through cache for query results that is aware
+of writes. Entries are keyed by the normalized SQL, its bind parameters and
+the current version counters of what the query depends on:
+
+- reads scoped to one row key (e.g. a PNR) depend on that key's version and
+  on the table's epoch;
+- other reads depend on the table version.
+
+A write to a known key bumps that key's version and the table version, so
+only the affected entries go stale; a write with no known key bumps the
+epoch as well, invalidating everything for the table. Storage is pluggable:
+an in-process LRU with TTL, or Redis so several workers share one cache.
+"""
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """Storage interface used by ResultCache."""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: float):
+        raise NotImplementedError
+
+    def get_version(self, name: str) -> int:
+        raise NotImplementedError
+
+    def bump_version(self, name: str) -> int:
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """A process-local LRU with per-entry TTL.
+
+    Version counters are bounded too (one exists per row key ever written).
+    Every bump takes the next value of a single sequence, and a counter that
+    is evicted reads back as the highest value evicted so far, so a name's
+    version never goes backwards: eviction can only cause extra misses, never
+    revive a stale entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_versions: int = None):
+        self.max_entries = max_entries
+        self.max_versions = max_versions or max(4 * max_entries, 4096)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._sequence = 0
+        self._evicted_floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self, name: str) -> int:
+        with self._lock:
+            version = self._versions.get(name)
+            if version is None:
+                return self._evicted_floor
+            self._versions.move_to_end(name)
+            return version
+
+    def bump_version(self, name: str) -> int:
+        with self._lock:
+            self._sequence += 1
+            self._versions[name] = self._sequence
+            self._versions.move_to_end(name)
+            while len(self._versions) > self.max_versions:
+                _, evicted = self._versions.popitem(last=False)
+                self._evicted_floor = max(self._evicted_floor, evicted)
+            return self._sequence
+
+
+class RedisBackend(CacheBackend):
+    """A Redis-backed store shared by every worker that points at the same server."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "convagent:rc:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisBackend requires the 'redis' package: pip install redis") from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def get_version(self, name: str) -> int:
+        value = self.client.get(self.prefix + "v:" + name)
+        return int(value) if value is not None else 0
+
+    def bump_version(self, name: str) -> int:
+        return int(self.client.incr(self.prefix + "v:" + name))
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and a trailing semicolon so equivalent SQL shares a key."""
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+class ResultCache:
+    """A write-aware read-through cache over a pluggable backend."""
+
+    def __init__(self, backend: CacheBackend = None, ttl: float = 60.0):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Storage backend. Defaults to an InMemoryBackend
+            ttl: Seconds an entry stays valid even if nothing writes to it
+        """
+        self.backend = backend or InMemoryBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+    def _versions(self, table: str, row_key: Optional[str]) -> str:
+        if row_key is not None:
+            epoch = self.backend.get_version(f"{table}:epoch")
+            return f"e{epoch}.k{self.backend.get_version(f'{table}:key:{row_key}')}"
+        return f"t{self.backend.get_version(f'{table}:table')}"
+
+    def version_tag(self, table: str, row_key: Optional[str] = None) -> str:
+        """Current version counters a read of ``table`` (scoped to ``row_key``) depends on."""
+        return self._versions(table, row_key)
+
+    def make_key(self, sql: str, params: Any, table: str, row_key: Optional[str] = None) -> str:
+        """Build the cache key for a read, including the current version counters."""
+        payload = json.dumps([normalize_sql(sql), params], sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+        return f"{table}:{digest}:{self._versions(table, row_key)}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_or_load(
+        self,
+        sql: str,
+        params: Any,
+        loader: Callable[[], Any],
+        table: str,
+        row_key: Optional[str] = None,
+        cacheable: Callable[[Any], bool] = None,
+    ) -> Any:
+        """Return the cached result for a read, or run ``loader`` and cache what it returns.
+
+        Args:
+            sql: The read's SQL, used (normalized) in the key
+            params: Bind parameters, used in the key
+            loader: Callable that runs the read
+            table: Table the read depends on
+            row_key: Row key (e.g. the PNR) the read is scoped to, if any
+            cacheable: Optional predicate; results it rejects are not stored
+        """
+        try:
+            key = self.make_key(sql, params, table, row_key)
+            cached = self.backend.get(key)
+        except Exception as e:
+            # A cache outage must not take reads down with it
+            logger.warning(f"Result cache unavailable: {str(e)}")
+            self._count("errors")
+            return loader()
+
+        if cached is not None:
+            self._count("hits")
+            return json.loads(cached)
+
+        self._count("misses")
+        result = loader()
+        if cacheable is None or cacheable(result):
+            try:
+                self.backend.set(key, json.dumps(result, default=str), self.ttl)
+            except Exception as e:
+                logger.warning(f"Result cache write failed: {str(e)}")
+                self._count("errors")
+        return result
+
+    async def aget_or_load(
+        self,
+        sql: str,
+        params: Any,
+        loader: Callable[[], Awaitable[Any]],
+        table: str,
+        row_key: Optional[str] = None,
+        cacheable: Callable[[Any], bool] = None,
+    ) -> Any:
+        """Async variant of ``get_or_load`` for callers whose ``loader`` is a coroutine function."""
+        try:
+            key = self.make_key(sql, params, table, row_key)
+            cached = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Result cache unavailable: {str(e)}")
+            self._count("errors")
+            return await loader()
+
+        if cached is not None:
+            self._count("hits")
+            return json.loads(cached)
+
+        self._count("misses")
+        result = await loader()
+        if cacheable is None or cacheable(result):
+            try:
+                self.backend.set(key, json.dumps(result, default=str), self.ttl)
+            except Exception as e:
+                logger.warning(f"Result cache write failed: {str(e)}")
+                self._count("errors")
+        return result
+
+    def invalidate(self, table: str, row_key: Optional[str] = None):
+        """Record a write to ``table``; pass ``row_key`` when the write touched one known key."""
+        try:
+            self.backend.bump_version(f"{table}:table")
+            if row_key is not None:
+                self.backend.bump_version(f"{table}:key:{row_key}")
+            else:
+                self.backend.bump_version(f"{table}:epoch")
+        except Exception as e:
+            logger.warning(f"Result cache invalidation failed: {str(e)}")
+            self._count("errors")
+            return
+        self._count("invalidations")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/invalidation counters and the hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def create_result_cache(backend: str = "memory", redis_url: str = None, max_entries: int = 1024,
+                        ttl: float = 60.0) -> ResultCache:
+    """Build a ResultCache for the named backend ("memory" or "redis")."""
+    if backend == "redis":
+        store = RedisBackend(redis_url or "redis://localhost:6379/0")
+    else:
+        store = InMemoryBackend(max_entries=max_entries)
+    return ResultCache(store, ttl=ttl)
+
+
+_default_cache: Optional[ResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide ResultCache configured from Config, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                try:
+                    from ..config import Config
+                except (ImportError, ValueError):
+                    from config import Config
+                _default_cache = create_result_cache(
+                    backend=Config.RESULT_CACHE_BACKEND,
+                    redis_url=Config.REDIS_URL,
+                    max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+                    ttl=Config.RESULT_CACHE_TTL,
+                )
+    return _default_cache
@@ -0,0 +1,189 @@
+"""
+Result Pager Module
+
+This module bounds what the SQL tools pull out of Postgres. SELECTs are read
+through a server-side (named) cursor capped at a configurable number of rows,
+paged with keyset tokens, and rendered in a compact columnar format so a
+large result never lands in memory or in the LLM prompt all at once.
+"""
+import re
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+_UNPAGEABLE = re.compile(r"\b(ORDER\s+BY|LIMIT|OFFSET|FETCH\s+FIRST|UNION|INTERSECT|EXCEPT)\b", re.IGNORECASE)
+
+
+class ResultPage(NamedTuple):
+    """One bounded page of a query result."""
+    columns: List[str]
+    rows: List[Tuple[Any, ...]]
+    has_more: bool
+    next_after: Any  # keyset value to resume after, or None if not keyset-paged
+
+
+def _keyset_sql(query: str, key_column: str, after: Any, placeholder: str = "%(__page_after)s") -> str:
+    """Wrap a SELECT so it is ordered by, and resumes after, ``key_column``."""
+    inner = query.strip().rstrip(";")
+    key = f'page_q."{key_column}"'
+    where = f" WHERE {key} > {placeholder}" if after is not None else ""
+    return f"SELECT * FROM ({inner}) AS page_q{where} ORDER BY {key}"
+
+
+def keyset_page(columns: List[str], rows: List[Tuple[Any, ...]], max_rows: int, key_column: str) -> Optional[ResultPage]:
+    """Cut ``max_rows + 1`` rows ordered by ``key_column`` into a page that ends on a key boundary.
+
+    The next page resumes with ``key > last key``, so rows sharing a key must
+    not straddle pages: the group the next page starts with is held back.
+    Returns None when one key value fills the whole page, which keyset
+    paging cannot split.
+    """
+    key_index = columns.index(key_column)
+    if len(rows) <= max_rows:
+        return ResultPage(columns, rows, False, None)
+    boundary = rows[max_rows][key_index]
+    cut = max_rows
+    while cut and rows[cut - 1][key_index] == boundary:
+        cut -= 1
+    if not cut:
+        return None
+    return ResultPage(columns, rows[:cut], True, rows[cut - 1][key_index])
+
+
+def _fetch(conn, sql: str, params: Optional[Dict[str, Any]], max_rows: int):
+    """Run a SELECT through a named cursor and fetch at most ``max_rows + 1`` rows."""
+    cursor = conn.cursor(name=f"page_{uuid.uuid4().hex[:12]}")
+    try:
+        cursor.itersize = max_rows + 1
+        cursor.execute(sql, params)
+        rows = cursor.fetchmany(max_rows + 1)
+        columns = [description[0] for description in cursor.description] if cursor.description else []
+        return columns, rows
+    finally:
+        cursor.close()
+
+
+def fetch_page(
+    conn,
+    query: str,
+    params: Optional[Dict[str, Any]] = None,
+    max_rows: int = 50,
+    key_column: Optional[str] = None,
+    after: Any = None,
+) -> ResultPage:
+    """Fetch one bounded page of a SELECT.
+
+    When ``key_column`` is given, the query has no ordering/limit of its own
+    and its result contains that column, the page is keyset-paginated on it;
+    otherwise the result is simply capped at ``max_rows``.
+
+    Args:
+        conn: Open psycopg2 connection (the caller owns the transaction; the
+            page is read inside it)
+        query: SELECT statement, optionally with ``%(name)s`` placeholders
+        params: Bind parameters for ``query``; when None, literal ``%`` signs
+            in the query are escaped before wrapping
+        max_rows: Maximum rows returned in the page
+        key_column: Column to keyset-paginate on
+        after: Key value of the last row of the previous page
+    """
+    if key_column and not _UNPAGEABLE.search(query):
+        keyset_query = query if params is not None else query.replace("%", "%%")
+        keyset_params = dict(params or {})
+        if after is not None:
+            keyset_params["__page_after"] = after
+        # A savepoint keeps the caller's transaction (and any SET LOCAL) if the wrap fails
+        savepoint = conn.cursor()
+        savepoint.execute("SAVEPOINT page_keyset")
+        try:
+            columns, rows = _fetch(conn, _keyset_sql(keyset_query, key_column, after), keyset_params, max_rows)
+            savepoint.execute("RELEASE SAVEPOINT page_keyset")
+            page = keyset_page(columns, rows, max_rows, key_column)
+            if page is not None:
+                return page
+        except psycopg2.Error as e:
+            # Typically the key column is not part of the result; fall back to a plain cap
+            logger.debug(f"Keyset pagination on {key_column} not possible: {str(e)}")
+            savepoint.execute("ROLLBACK TO SAVEPOINT page_keyset")
+        finally:
+            savepoint.close()
+
+    columns, rows = _fetch(conn, query, params, max_rows)
+    has_more = len(rows) > max_rows
+    return ResultPage(columns, rows[:max_rows], has_more, None)
+
+
+def format_table(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Render rows as the pipe-separated table the SQL tools have always returned."""
+    formatted_results = []
+    if columns:
+        formatted_results.append(" | ".join(columns))
+        formatted_results.append("-" * (sum(len(str(col)) for col in columns) + 3 * (len(columns) - 1)))
+    for row in rows:
+        formatted_results.append(" | ".join(str(value) for value in row))
+    return "\n".join(formatted_results)
+
+
+def format_columnar(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Render rows compactly: columns with one value across the page are hoisted
+    into a single ``name=value`` line, the rest are listed once in a header."""
+    if len(rows) > 1:
+        constant = [i for i in range(len(columns)) if all(row[i] == rows[0][i] for row in rows)]
+    else:
+        constant = []
+    varying = [i for i in range(len(columns)) if i not in constant]
+
+    lines = []
+    if constant:
+        lines.append(f"all {len(rows)} rows: " + "; ".join(f"{columns[i]}={rows[0][i]}" for i in constant))
+    if varying:
+        lines.append("|".join(columns[i] for i in varying))
+        for row in rows:
+            lines.append("|".join(str(row[i]) for i in varying))
+    return "\n".join(lines)
+
+
+def format_page(page: ResultPage, output_format: str = "columnar", page_token: Optional[str] = None) -> str:
+    """Render a page, appending a "more available" marker when it was truncated."""
+    if not page.rows:
+        return "No results found."
+    formatter = format_columnar if output_format == "columnar" else format_table
+    text = formatter(page.columns, page.rows)
+    if page.has_more:
+        if page_token:
+            text += f"\n[more available: {len(page.rows)} rows shown; request page_token={page_token} for the next page]"
+        else:
+            text += f"\n[more available: only the first {len(page.rows)} rows are shown; narrow the query]"
+    return text
+
+
+class PageTokenStore:
+    """A bounded map from opaque page tokens to the query state needed to resume."""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._tokens: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def issue(self, query: str, params: Optional[Dict[str, Any]], after: Any) -> str:
+        """Remember where a paged query stopped and return a token for it."""
+        token = uuid.uuid4().hex[:10]
+        with self._lock:
+            self._tokens[token] = {"query": query, "params": params, "after": after}
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+        return token
+
+    def redeem(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return and forget the state for ``token``, or None if it is unknown or expired."""
+        with self._lock:
+            return self._tokens.pop(token, None)
+
+
+PAGE_TOKEN_PATTERN = re.compile(r"\bpage_token\s*[=:]\s*([0-9a-f]{10})\b")
@@ -0,0 +1,124 @@
+"""
+Schema Cache Module
+
+This module implements the SchemaCache class, which introspects a database's
+tables and columns (``information_schema`` on Postgres, ``PRAGMA table_info``
+on SQLite) through the tool's SQL backend and renders a
+compact schema block for SQL-generation prompts. The schema is loaded once,
+refreshed after a configurable interval, and only the tables relevant to a
+request are rendered so prompts stay small and match the live schema.
+"""
+import re
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .sql_backend import SQLBackend, PostgresBackend
+except ImportError:
+    from sql_backend import SQLBackend, PostgresBackend
+
+logger = logging.getLogger(__name__)
+
+Schema = Dict[str, List[Tuple[str, str]]]
+
+
+def _words(text: str) -> set:
+    """Lower-cased word stems used to match a request against table and column names."""
+    return {word.rstrip("s") for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2}
+
+
+class SchemaCache:
+    """Caches a database's table/column layout and renders it for prompts."""
+
+    def __init__(
+        self,
+        dbname: str,
+        refresh_interval: float = 600.0,
+        fallback: Optional[Schema] = None,
+        ignore_tables: Iterable[str] = (),
+        schema_name: str = "public",
+        backend: Optional[SQLBackend] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            dbname: Postgres database to introspect when no ``backend`` is given
+            refresh_interval: Seconds before the cached schema is re-read
+            fallback: Schema used until introspection succeeds
+            ignore_tables: Tables never shown to the LLM (e.g. bookkeeping tables)
+            schema_name: Postgres schema to introspect
+            backend: SQL backend to introspect through. Defaults to the
+                pooled Postgres backend for ``dbname``
+        """
+        self.dbname = dbname
+        self.backend = backend or PostgresBackend(dbname)
+        self.refresh_interval = refresh_interval
+        self.schema_name = schema_name
+        self.ignore_tables = set(ignore_tables)
+        self._schema: Schema = dict(fallback or {})
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Re-read the schema through the backend. Returns False and keeps the
+        previous schema if the database cannot be reached."""
+        try:
+            rows = self.backend.load_schema(self.schema_name)
+        except Exception as e:
+            logger.warning(f"Schema introspection for '{self.dbname}' failed: {str(e)}")
+            with self._lock:
+                # Back off for a full interval rather than retrying on every request
+                self._loaded_at = time.monotonic()
+            return False
+
+        schema: Schema = {}
+        for table, column, data_type in rows:
+            if table not in self.ignore_tables:
+                schema.setdefault(table, []).append((column, data_type))
+        with self._lock:
+            if schema:
+                self._schema = schema
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded schema for '{self.dbname}': {len(schema)} tables")
+        return True
+
+    def get_schema(self) -> Schema:
+        """Return the cached schema, refreshing it first if it is older than the interval."""
+        if time.monotonic() - self._loaded_at > self.refresh_interval:
+            self.refresh()
+        with self._lock:
+            return self._schema
+
+    def fingerprint(self) -> str:
+        """A short hash of the current schema, for invalidating schema-dependent caches."""
+        schema = self.get_schema()
+        digest = hashlib.sha256(repr(sorted(schema.items())).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def relevant_tables(self, request: str) -> List[str]:
+        """Tables whose name or columns share words with the request; all tables if none do."""
+        schema = self.get_schema()
+        request_words = _words(request)
+        scores = {}
+        for table, columns in schema.items():
+            score = 2 * len(request_words & _words(table.replace("_", " ")))
+            score += sum(1 for column, _ in columns if _words(column.replace("_", " ")) & request_words)
+            if score:
+                scores[table] = score
+        if not scores:
+            return list(schema)
+        return sorted(scores, key=scores.get, reverse=True)
+
+    def render(self, request: str = "") -> str:
+        """Render a compact schema block, one line per relevant table:
+        ``"Table"("Column" type, ...)``."""
+        schema = self.get_schema()
+        lines = []
+        for table in self.relevant_tables(request):
+            columns = ", ".join(f'"{column}" {data_type}' for column, data_type in schema[table])
+            lines.append(f'"{table}"({columns})')
+        return "\n".join(lines)
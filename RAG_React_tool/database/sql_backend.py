@@ -0,0 +1,235 @@
+"""
+SQL Backend Module
+
+The SQL tools run their statements through an SQLBackend, so where the data
+lives is a per-tool setting:
+
+- PostgresBackend: the shared connection pool, server-side cursors and the
+  EXPLAIN cost guard;
+- SQLiteBackend: a read-only, memory-mapped SQLite file served in-process,
+  e.g. the shipped ``.db`` files. Small, read-mostly data such as the flight
+  schedule skips the network round trip entirely, and it needs no live
+  database, which makes it usable in tests.
+
+Both accept the ``%(name)s`` placeholders the tools generate.
+"""
+import re
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+
+try:
+    from .pg_pool import get_pool
+    from .result_pager import ResultPage, fetch_page, keyset_page, _keyset_sql, _UNPAGEABLE
+except ImportError:
+    from pg_pool import get_pool
+    from result_pager import ResultPage, fetch_page, keyset_page, _keyset_sql, _UNPAGEABLE
+
+logger = logging.getLogger(__name__)
+
+SchemaRows = List[Tuple[str, str, str]]  # (table, column, data type)
+
+_PYFORMAT_PARAM = re.compile(r"%\((\w+)\)s")
+
+
+class SQLBackend:
+    """Interface the SQL tools run queries through."""
+
+    name = "base"
+    dialect = "SQL"  # shown to the LLM in the SQL-generation prompt
+    errors: Tuple[type, ...] = ()  # driver errors reported to the agent as query errors
+    supports_guard = False  # whether the EXPLAIN cost guard applies
+
+    def connection(self):
+        """Context manager yielding a connection for one statement (or one guarded read)."""
+        raise NotImplementedError
+
+    def fetch_page(self, conn, query: str, params: Optional[Dict[str, Any]] = None, max_rows: int = 50,
+                   key_column: Optional[str] = None, after: Any = None) -> ResultPage:
+        """Fetch one bounded page of a SELECT (see ``result_pager.fetch_page``)."""
+        raise NotImplementedError
+
+    def execute(self, conn, query: str, params: Optional[Dict[str, Any]] = None) -> Optional[ResultPage]:
+        """Run and commit a write; returns the RETURNING rows, if any."""
+        raise NotImplementedError
+
+    def load_schema(self, schema_name: str = "public") -> SchemaRows:
+        """Return every table's columns and types, in column order."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PostgresBackend(SQLBackend):
+    """Queries a Postgres database through the shared connection pool."""
+
+    name = "postgres"
+    dialect = "PostgreSQL"
+    errors = (psycopg2.Error,)
+    supports_guard = True
+
+    SCHEMA_QUERY = """
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = %s
+        ORDER BY table_name, ordinal_position
+    """
+
+    def __init__(self, dbname: str):
+        self.dbname = dbname
+
+    def connection(self):
+        return get_pool(self.dbname).connection()
+
+    def fetch_page(self, conn, query, params=None, max_rows=50, key_column=None, after=None) -> ResultPage:
+        return fetch_page(conn, query, params, max_rows=max_rows, key_column=key_column, after=after)
+
+    def execute(self, conn, query, params=None) -> Optional[ResultPage]:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        page = None
+        if cursor.description:
+            # e.g. UPDATE ... RETURNING
+            columns = [description[0] for description in cursor.description]
+            page = ResultPage(columns, cursor.fetchall(), False, None)
+        conn.commit()
+        return page
+
+    def load_schema(self, schema_name: str = "public") -> SchemaRows:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.SCHEMA_QUERY, (schema_name,))
+            return cursor.fetchall()
+
+
+class SQLiteBackend(SQLBackend):
+    """Serves a SQLite file in-process, read-only and memory-mapped by default.
+
+    Each thread gets its own connection, opened on first use, so concurrent
+    tool calls never share a cursor.
+    """
+
+    name = "sqlite"
+    dialect = "SQLite"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path: str, read_only: bool = True, mmap_size: int = 64 * 1024 * 1024):
+        """
+        Initialize the backend.
+
+        Args:
+            path: SQLite database file
+            read_only: Open the file read-only; writes then fail with a query error
+            mmap_size: Bytes of the file to memory-map (``PRAGMA mmap_size``); 0 disables it
+        """
+        self.path = path
+        self.read_only = read_only
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.mmap_size:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        with self._lock:
+            self._connections.append(conn)
+        logger.info(f"Opened SQLite backend at {self.path} (read_only={self.read_only})")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+    @staticmethod
+    def _translate(query: str, params: Optional[Dict[str, Any]]) -> str:
+        """Rewrite ``%(name)s`` placeholders (and ``%%`` escapes) into SQLite's ``:name`` style."""
+        if params is None:
+            return query
+        return _PYFORMAT_PARAM.sub(r":\1", query).replace("%%", "%")
+
+    @staticmethod
+    def _fetch(conn, sql: str, params, max_rows: int):
+        cursor = conn.execute(sql, params or {})
+        try:
+            # SQLite steps lazily, so only max_rows + 1 rows are ever produced
+            rows = cursor.fetchmany(max_rows + 1)
+            columns = [description[0] for description in cursor.description] if cursor.description else []
+            return columns, rows
+        finally:
+            cursor.close()
+
+    def fetch_page(self, conn, query, params=None, max_rows=50, key_column=None, after=None) -> ResultPage:
+        query = self._translate(query, params)
+        if key_column and not _UNPAGEABLE.search(query):
+            keyset_params = dict(params or {})
+            if after is not None:
+                keyset_params["__page_after"] = after
+            try:
+                sql = _keyset_sql(query, key_column, after, placeholder=":__page_after")
+                columns, rows = self._fetch(conn, sql, keyset_params, max_rows)
+                page = keyset_page(columns, rows, max_rows, key_column)
+                if page is not None:
+                    return page
+            except (sqlite3.Error, ValueError) as e:
+                # Typically the key column is not part of the result; fall back to a plain cap
+                logger.debug(f"Keyset pagination on {key_column} not possible: {str(e)}")
+
+        columns, rows = self._fetch(conn, query, params, max_rows)
+        return ResultPage(columns, rows[:max_rows], len(rows) > max_rows, None)
+
+    def execute(self, conn, query, params=None) -> Optional[ResultPage]:
+        cursor = conn.execute(self._translate(query, params), params or {})
+        page = None
+        if cursor.description:
+            columns = [description[0] for description in cursor.description]
+            page = ResultPage(columns, cursor.fetchall(), False, None)
+        conn.commit()
+        return page
+
+    def load_schema(self, schema_name: str = "public") -> SchemaRows:
+        rows: SchemaRows = []
+        with self.connection() as conn:
+            tables = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            ).fetchall()
+            for (table,) in tables:
+                for _, column, data_type, _, _, _ in conn.execute(f'PRAGMA table_info("{table}")'):
+                    rows.append((table, column, data_type.lower()))
+        return rows
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def create_backend(kind: str, dbname: str = None, path: str = None,
+                   mmap_size: int = 64 * 1024 * 1024) -> SQLBackend:
+    """Build the backend named ``kind`` ("postgres" or "sqlite") for one tool."""
+    if kind == "sqlite":
+        if not path:
+            raise ValueError("The sqlite backend needs a database file path")
+        return SQLiteBackend(path, mmap_size=mmap_size)
+    if kind == "postgres":
+        return PostgresBackend(dbname)
+    raise ValueError(f"Unknown SQL backend '{kind}' (expected 'postgres' or 'sqlite')")
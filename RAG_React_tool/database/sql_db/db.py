@@ -1,5 +1,9 @@
+import os
+import sys
 import sqlite3
-import csv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from database.bulk_loader import RESERVATION_SPEC, load_sqlite
 
 # Connect to or create the database
 conn = sqlite3.connect('Flight_reservation.db')
@@ -7,46 +11,9 @@ cursor = conn.cursor()
 
 
 def create_and_insert_Data(conn, cursor):
-
-    cursor.execute('''
-    create table IF NOT EXISTS Flight_reservation (
-        PNR_Number VARCHAR(10),
-        Customer_Name VARCHAR(50),
-        Flight_ID VARCHAR(50),
-        Airline VARCHAR(50),
-        From_City VARCHAR(50),
-        To_City VARCHAR(50),
-        Departure_Time TIME,
-        Arrival_Time TIME,
-        Travel_Date DATE,
-        Booking_Date DATE,
-        Booking_Status VARCHAR(20),
-        Refund_Status VARCHAR(20)
-    )''')
-
-
-
-    with open('data.csv', 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        # Accessing header names
-        header = reader.fieldnames
-        print(f"Header: {header}")
-
-        # Iterating through rows as dictionaries
-        for row in reader:
-            print(row) # Each 'row' is a dictionary
-            # Example: Accessing data by header name
-            # print(f"Name: {row['Name']}, Age: {row['Age']}")
-            query = f"""insert into Flight_reservation (PNR_Number, Customer_Name, Flight_ID, Airline, From_City, To_City,
-    Departure_Time, Arrival_Time, Travel_Date, Booking_Date, Booking_Status, Refund_Status)
-    values ("{row['PNR_Number']}", "{row['Customer_Name']}", "{row['Flight_ID']}", "{row['Airline']}", "{row['From_City']}", 
-    "{row['To_City']}", "{row['Departure_Time']}", "{row['Arrival_Time']}", "{row['Travel_Date']}","{row['Booking_Date']}", 
-    "{row['Booking_Status']}","{row['Refund_Status']}")"""
-            
-            print(f"=======\n {query}")
-            cursor.execute(query);
-            
-    conn.commit()
+    """Create the Flight_reservation table and stream data.csv into it in batches."""
+    stats = load_sqlite(conn, RESERVATION_SPEC, create=True)
+    print(f"Flight_reservation: {stats}")
 
 
 
@@ -1,11 +1,14 @@
 # react-agent/main.py
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import httpx
 import os
 import json
+import asyncio
 from typing import Dict, Any
 from langchain.agents import Tool, AgentExecutor, create_react_agent
+from langchain.callbacks.base import AsyncCallbackHandler
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 import sys
@@ -25,7 +28,8 @@ RAG_TOOL_URL = os.getenv("RAG_TOOL_URL", "http://localhost:8002/search")
 SCHEDULE_SERVICE_URL = os.getenv("SCHEDULE_SERVICE_URL", "http://localhost:8003/query")
 
 # ---- LangChain ReAct Agent Setup ---- #
-llm = ChatOpenAI(model_name=os.getenv("OPENAI_MODEL_NAME", "gpt-4"), temperature=float(os.getenv("OPENAI_TEMPERATURE", "0")), openai_api_key=os.getenv("OPENAI_API_KEY"))
+# streaming=True makes the model report tokens to callbacks as they arrive (used by /react-agent/stream)
+llm = ChatOpenAI(model_name=os.getenv("OPENAI_MODEL_NAME", "gpt-4"), temperature=float(os.getenv("OPENAI_TEMPERATURE", "0")), openai_api_key=os.getenv("OPENAI_API_KEY"), streaming=True)
 
 react_prompt = PromptTemplate.from_template("""
 You are a helpful AI agent that assists users with flight reservations, policies, cancellations, and schedules.
@@ -157,6 +161,83 @@ async def react_agent(input: QueryInput):
     except Exception as e:
         return {"error": str(e)}
 
+# ---- Streaming ---- #
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class AnswerStreamHandler(AsyncCallbackHandler):
+    """Puts (event, data) pairs on a queue: a status event when a tool is called
+    and the tokens of the final answer. Thoughts and actions stay internal, so
+    tokens are only forwarded once the model has written "Final Answer:"."""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self._text = ""
+        self._answering = False
+        self._emitted = False
+
+    async def on_llm_start(self, serialized, prompts, **kwargs):
+        self._text = ""
+        self._answering = False
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        await self.on_llm_start(serialized, [], **kwargs)
+
+    async def on_llm_new_token(self, token: str, **kwargs):
+        if not self._answering:
+            self._text += token
+            index = self._text.find(FINAL_ANSWER_MARKER)
+            if index < 0:
+                return
+            self._answering = True
+            token = self._text[index + len(FINAL_ANSWER_MARKER):]
+        if not self._emitted:
+            token = token.lstrip()
+        if token:
+            self._emitted = True
+            await self.queue.put(("token", {"text": token}))
+
+    async def on_tool_start(self, serialized, input_str: str, **kwargs):
+        name = (serialized or {}).get("name", "tool")
+        await self.queue.put(("status", {"message": f"Calling {name}...", "tool": name, "input": input_str}))
+
+async def stream_agent_answer(question: str):
+    """Yield server-sent events while the agent runs: ``status`` per tool call,
+    ``token`` for each piece of the final answer, then ``done`` with the full
+    answer (or ``error``)."""
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(
+        agent_executor.ainvoke({"input": question}, config={"callbacks": [AnswerStreamHandler(queue)]})
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        yield sse_event("status", {"message": "Thinking..."})
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield sse_event(*item)
+        try:
+            result = task.result()
+            yield sse_event("done", {"answer": result.get("output")})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+    finally:
+        # The client went away mid-answer; stop the agent rather than finish it for nobody
+        if not task.done():
+            task.cancel()
+
+@app.post("/react-agent/stream")
+async def react_agent_stream(input: QueryInput):
+    """Like /react-agent, but streams progress and the answer as server-sent events."""
+    return StreamingResponse(
+        stream_agent_answer(input.question),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,3 +1,4 @@
 from .sql_tool import SQLTool, get_sql_tool
+from .async_sql_tool import AsyncSQLTool, get_async_sql_tool
 
-__all__ = ['SQLTool', 'get_sql_tool']
+__all__ = ['SQLTool', 'get_sql_tool', 'AsyncSQLTool', 'get_async_sql_tool']
@@ -89,20 +89,7 @@ class SQLTool:
                 results = cursor.fetchall()
                 columns = [description[0] for description in cursor.description] if cursor.description else []
                 conn.close()
-
-                if not results:
-                    return "No results found."
-                    
-                # Format the results as a table
-                formatted_results = []
-                if columns:
-                    formatted_results.append(" | ".join(columns))
-                    formatted_results.append("-" * (sum(len(str(col)) for col in columns) + 3 * (len(columns) - 1)))
-                
-                for row in results:
-                    formatted_results.append(" | ".join(str(value) for value in row))
-                
-                return "\n".join(formatted_results)
+                return self._format_results(columns, results)
             else:
                 conn.commit()
                 conn.close()
@@ -111,35 +98,47 @@ class SQLTool:
         except psycopg2.Error as e:
             return f"Error executing query: {str(e)}"
 
+    @staticmethod
+    def _clean_sql_query(sql_query: str) -> str:
+        """Strip the prompt label and markdown code fences from generated SQL."""
+        for x in ['SQLQuery:', "```sql", "```"]:
+            sql_query = sql_query.replace(x, '')
+        return sql_query.strip()
+
+    @staticmethod
+    def _format_results(columns, results) -> str:
+        """Format rows as a pipe-separated table."""
+        if not results:
+            return "No results found."
+        formatted_results = []
+        if columns:
+            formatted_results.append(" | ".join(columns))
+            formatted_results.append("-" * (sum(len(str(col)) for col in columns) + 3 * (len(columns) - 1)))
+        for row in results:
+            formatted_results.append(" | ".join(str(value) for value in row))
+        return "\n".join(formatted_results)
+
+    @staticmethod
+    def _format_response(request: str, sql_query: str, result: str) -> str:
+        """Build the tool response from the executed query and its result."""
+        response = f"SQL Query: {sql_query}\n\nResult:\n{result}"
+
+        # Special handling for cancellation
+        if "cancelled" in request.lower() or "cancel" in request.lower():
+            response += "\n\nNote: Please confirm the cancellation details above. " \
+                        "Refund will be processed as per the airline's cancellation policy."
+        return response
+
     def __call__(self, request: str) -> str:
         """Process a natural language request and return the SQL query results."""
         try:
             # Generate the SQL query
-            sql_query = self.sql_chain.invoke(request)
-            for x in ['SQLQuery:', "```sql", "```"]:
-                if x in sql_query:
-                    sql_query = sql_query.replace(x, '') 
-                else:
-                    sql_query 
-
-            # Clean up the SQL query (remove any markdown code blocks if present)
-            # if "```sql" in sql_query:
-            #     sql_query = sql_query.split("```sql")[1].split("```")[0].strip()
-            # elif "```" in sql_query:
-            #     sql_query = sql_query.split("```")[1].strip()
+            sql_query = self._clean_sql_query(self.sql_chain.invoke(request))
 
             # Execute the query
             result = self.execute_query(sql_query)
+            return self._format_response(request, sql_query, result)
 
-            # Format the response
-            response = f"SQL Query: {sql_query}\n\nResult:\n{result}"
-           
-            # Special handling for cancellation
-            if "cancelled" in request.lower() or "cancel" in request.lower():
-                response += "\n\nNote: Please confirm the cancellation details above. " \
-                          "Refund will be processed as per the airline's cancellation policy."
-            return response
-            
         except Exception as e:
             return f"Error processing request: {str(e)}"
 
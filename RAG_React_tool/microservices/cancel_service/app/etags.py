@@ -0,0 +1,114 @@
+"""
+ETag Module
+
+Strong ETags for reservation reads. The tag is a hash of the row as served.
+A small in-process map remembers the last tag per PNR together with the
+result cache's version counters for that PNR at the time. A conditional GET
+is answered 304 from the map alone while those counters are unchanged (no
+write through this service has touched the PNR or the whole table) and the
+entry is younger than its TTL, which bounds staleness from writes made
+outside the service.
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from database.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class ETagEntry(NamedTuple):
+    etag: str
+    cancelled: bool
+    versions: str
+    stored_at: float
+
+
+def compute_etag(row: Dict[str, Any]) -> str:
+    """Strong ETag (quoted) for a row, stable across workers."""
+    payload = json.dumps(row, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches ``etag``."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ETagMap:
+    """Per-worker LRU of the last ETag served per row key."""
+
+    def __init__(self, cache: ResultCache, table: str, max_entries: int = 10000, ttl: float = 60.0):
+        """
+        Initialize the map.
+
+        Args:
+            cache: Result cache whose version counters record writes to ``table``
+            table: Table the rows come from
+            max_entries: Row keys remembered
+            ttl: Seconds an entry may answer 304 without a read
+        """
+        self.cache = cache
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, ETagEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"current": 0, "stale": 0, "stored": 0}
+
+    def _versions(self, row_key: str) -> Optional[str]:
+        try:
+            return self.cache.version_tag(self.table, row_key)
+        except Exception as e:
+            logger.warning(f"Could not read row versions for {row_key}: {str(e)}")
+            return None
+
+    def lookup(self, row_key: str) -> Optional[ETagEntry]:
+        """The remembered entry for ``row_key`` if it is still current, else None."""
+        with self._lock:
+            entry = self._entries.get(row_key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl or entry.versions != self._versions(row_key):
+            with self._lock:
+                if self._entries.get(row_key) is entry:
+                    del self._entries[row_key]
+                self._stats["stale"] += 1
+            return None
+        with self._lock:
+            self._stats["current"] += 1
+        return entry
+
+    def remember(self, row_key: str, row: Dict[str, Any], cancelled: bool, versions: Optional[str]) -> ETagEntry:
+        """Store the tag of ``row`` as just served.
+
+        ``versions`` must be read before the row was loaded, so a write racing
+        the read leaves the entry already stale rather than wrongly current.
+        """
+        entry = ETagEntry(compute_etag(row), cancelled, versions, time.monotonic())
+        if versions is None:
+            return entry
+        with self._lock:
+            self._entries[row_key] = entry
+            self._entries.move_to_end(row_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stats["stored"] += 1
+        return entry
+
+    def versions(self, row_key: str) -> Optional[str]:
+        """Current version counters for ``row_key``; pass them to ``remember``."""
+        return self._versions(row_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
@@ -1,22 +1,47 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from collections import deque
+from datetime import date
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import psycopg2
+from typing import List, Optional
+import asyncio
+import asyncpg
 import os
+import sys
+import json
+import time
 import logging
-import re
+
+# The result cache is shared with the agent's SQL tools (database/result_cache.py);
+# locally it is found from the project root, in the image it is copied next to app/
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from database.result_cache import create_result_cache
+
+try:
+    from .query_parser import parse_query
+    from .etags import ETagMap, etag_matches
+except ImportError:
+    from query_parser import parse_query
+    from etags import ETagMap, etag_matches
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Cancel Service")
-
 class QueryRequest(BaseModel):
     query: str
 
 class HealthCheck(BaseModel):
     status: str
 
+class BatchReservationRequest(BaseModel):
+    pnrs: List[str]
+
 # Database config from env
 DB_HOST = os.getenv("PG_HOST", "localhost")
 DB_PORT = int(os.getenv("PG_PORT", "5432"))
@@ -24,101 +49,489 @@ DB_NAME = os.getenv("PG_DB", "postgres")
 DB_USER = os.getenv("PG_USER", "postgres")
 DB_PASS = os.getenv("PG_PASSWORD", "")
 
-def get_db_connection():
+# Each uvicorn worker holds its own pool, so the connection budget is split across
+# WEB_CONCURRENCY workers unless PG_POOL_MAX_SIZE fixes the per-worker size.
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+PG_CONNECTION_BUDGET = int(os.getenv("PG_CONNECTION_BUDGET", "10"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "0")) or max(2, PG_CONNECTION_BUDGET // WORKERS)
+PG_POOL_MIN_SIZE = min(int(os.getenv("PG_POOL_MIN_SIZE", "1")), PG_POOL_MAX_SIZE)
+PG_POOL_ACQUIRE_TIMEOUT = float(os.getenv("PG_POOL_ACQUIRE_TIMEOUT", "10"))
+PG_STATEMENT_TIMEOUT_MS = os.getenv("PG_STATEMENT_TIMEOUT_MS", "5000")
+
+db_pool: Optional[asyncpg.Pool] = None
+# Time spent waiting for a pooled connection (ms), over the most recent acquisitions
+_pool_waits = deque(maxlen=1000)
+_pool_stats = {"acquired": 0, "timeouts": 0}
+
+# Reservation read cache ("memory" per worker, or "redis" shared across workers)
+result_cache = create_result_cache(
+    backend=os.getenv("RESULT_CACHE_BACKEND", "memory"),
+    redis_url=os.getenv("REDIS_URL", "redis://redis:6379/0"),
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "60")),
+)
+RESERVATION_TABLE = "Flight_reservation"
+# Conditional GETs on /reservations/{pnr}: a 304 is answered from this map without a read
+reservation_etags = ETagMap(
+    result_cache,
+    RESERVATION_TABLE,
+    max_entries=int(os.getenv("ETAG_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("ETAG_TTL", os.getenv("RESULT_CACHE_TTL", "60"))),
+)
+# Cancelled bookings no longer change, so clients may reuse them; active ones must revalidate
+CANCELLED_CACHE_CONTROL = f"private, max-age={int(os.getenv('CANCELLED_RESERVATION_MAX_AGE', '3600'))}"
+ACTIVE_CACHE_CONTROL = "private, no-cache"
+RESERVATION_SQL = 'SELECT * FROM "Flight_reservation" WHERE UPPER("PNR_Number") = $1'
+BATCH_RESERVATION_SQL = 'SELECT * FROM "Flight_reservation" WHERE UPPER("PNR_Number") = ANY($1::text[])'
+MAX_BATCH_PNRS = int(os.getenv("MAX_BATCH_PNRS", "500"))
+FLIGHT_RESERVATIONS_SQL = """
+    SELECT * FROM "Flight_reservation" WHERE UPPER("Flight_ID") = ANY($1::text[])
+    ORDER BY "Flight_ID", "PNR_Number" LIMIT $2
+"""
+PASSENGER_RESERVATIONS_SQL = """
+    SELECT * FROM "Flight_reservation" WHERE LOWER("Customer_Name") = ANY($1::text[])
+    ORDER BY "Customer_Name", "PNR_Number" LIMIT $2
+"""
+# Rows returned per flight or passenger lookup from /query
+QUERY_ROW_LIMIT = int(os.getenv("QUERY_ROW_LIMIT", "200"))
+
+# One statement cancels atomically: the conditional UPDATE takes the row lock and
+# re-checks the status, so concurrent cancels of one PNR transition it exactly once.
+CANCEL_SQL = """
+    WITH updated AS (
+        UPDATE "Flight_reservation"
+        SET "Booking_Status" = 'Cancelled', "Refund_Status" = 'Refunded'
+        WHERE UPPER("PNR_Number") = $1
+          AND LOWER("Booking_Status") <> 'cancelled'
+        RETURNING "Refund_Status"
+    )
+    SELECT 'cancelled' AS outcome, "Refund_Status" AS refund_status FROM updated
+    UNION ALL
+    SELECT 'already_cancelled', "Refund_Status" FROM "Flight_reservation"
+    WHERE UPPER("PNR_Number") = $1
+      AND NOT EXISTS (SELECT 1 FROM updated)
+"""
+# Multi-PNR variant for /query; the final SELECT sees the rows as they were before
+# the UPDATE, so PNRs this statement cancelled are excluded from already_cancelled.
+BATCH_CANCEL_SQL = """
+    WITH updated AS (
+        UPDATE "Flight_reservation"
+        SET "Booking_Status" = 'Cancelled', "Refund_Status" = 'Refunded'
+        WHERE UPPER("PNR_Number") = ANY($1::text[])
+          AND LOWER("Booking_Status") <> 'cancelled'
+        RETURNING UPPER("PNR_Number") AS pnr, "Refund_Status"
+    )
+    SELECT pnr, 'cancelled' AS outcome, "Refund_Status" AS refund_status FROM updated
+    UNION ALL
+    SELECT UPPER("PNR_Number"), 'already_cancelled', "Refund_Status" FROM "Flight_reservation"
+    WHERE UPPER("PNR_Number") = ANY($1::text[])
+      AND UPPER("PNR_Number") NOT IN (SELECT pnr FROM updated)
+"""
+# An idempotency key is claimed before the cancel runs. A concurrent request with the
+# same key blocks on the claim until the first commits, then replays its stored
+# response; an expired key is claimed afresh.
+CLAIM_IDEMPOTENCY_KEY_SQL = """
+    INSERT INTO cancel_idempotency (key, pnr, response) VALUES ($1, $2, 'null'::jsonb)
+    ON CONFLICT (key) DO UPDATE SET pnr = EXCLUDED.pnr, response = EXCLUDED.response, created_at = now()
+    WHERE cancel_idempotency.created_at <= now() - $3::float8 * interval '1 hour'
+    RETURNING key
+"""
+PRIOR_IDEMPOTENT_RESPONSE_SQL = "SELECT pnr, response FROM cancel_idempotency WHERE key = $1"
+SAVE_IDEMPOTENT_RESPONSE_SQL = "UPDATE cancel_idempotency SET response = $2::jsonb WHERE key = $1"
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+
+# Bulk disruption cancellation: each batch cancels the next PNRs (in PNR order) and
+# advances the job's checkpoint in the same transaction, so a crashed job resumes
+# exactly where its last committed batch ended.
+DISRUPTION_BATCH_SIZE = int(os.getenv("DISRUPTION_BATCH_SIZE", "100"))
+DISRUPTION_BATCH_SQL = """
+    WITH batch AS (
+        SELECT "PNR_Number" FROM "Flight_reservation"
+        WHERE "Flight_ID" = $2
+          AND ($3::date IS NULL OR "Travel_Date" = $3::date)
+          AND LOWER("Booking_Status") <> 'cancelled'
+          AND "PNR_Number" > $4
+        ORDER BY "PNR_Number"
+        LIMIT $5
+        FOR UPDATE
+    ),
+    updated AS (
+        UPDATE "Flight_reservation" r
+        SET "Booking_Status" = 'Cancelled', "Refund_Status" = 'Refunded'
+        FROM batch
+        WHERE r."PNR_Number" = batch."PNR_Number"
+          AND r."Flight_ID" = $2
+          AND LOWER(r."Booking_Status") <> 'cancelled'
+        RETURNING r."PNR_Number"
+    ),
+    checkpoint AS (
+        UPDATE disruption_jobs
+        SET last_pnr = COALESCE((SELECT MAX("PNR_Number") FROM batch), last_pnr),
+            cancelled = cancelled + (SELECT COUNT(*) FROM updated),
+            batches = batches + 1,
+            updated_at = now()
+        WHERE job_id = $1 AND EXISTS (SELECT 1 FROM batch)
+        RETURNING last_pnr, cancelled
+    )
+    SELECT (SELECT COUNT(*) FROM batch) AS selected,
+           (SELECT array_agg("PNR_Number") FROM updated) AS pnrs,
+           (SELECT last_pnr FROM checkpoint) AS last_pnr,
+           (SELECT cancelled FROM checkpoint) AS cancelled
+"""
+START_DISRUPTION_JOB_SQL = """
+    INSERT INTO disruption_jobs (job_id, flight_id, travel_date, status)
+    VALUES ($1, $2, $3, 'running')
+    ON CONFLICT (job_id) DO UPDATE SET
+        status = 'running',
+        last_pnr = CASE WHEN disruption_jobs.status = 'completed' THEN '' ELSE disruption_jobs.last_pnr END,
+        cancelled = CASE WHEN disruption_jobs.status = 'completed' THEN 0 ELSE disruption_jobs.cancelled END,
+        batches = CASE WHEN disruption_jobs.status = 'completed' THEN 0 ELSE disruption_jobs.batches END,
+        started_at = CASE WHEN disruption_jobs.status = 'completed' THEN now() ELSE disruption_jobs.started_at END,
+        updated_at = now()
+    RETURNING last_pnr, cancelled, batches, (xmax <> 0 AND last_pnr <> '') AS resumed
+"""
+
+# Created by database/migrations.py (versions 6 and 7); checked at startup
+SERVICE_TABLES = ("cancel_idempotency", "disruption_jobs")
+PURGE_IDEMPOTENCY_KEYS_SQL = "DELETE FROM cancel_idempotency WHERE created_at < now() - $1::float8 * interval '1 hour'"
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+
+@asynccontextmanager
+async def acquire_connection():
+    """Borrow a pooled connection, recording how long the request waited for it."""
+    started = time.perf_counter()
+    try:
+        conn = await db_pool.acquire(timeout=PG_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _pool_stats["timeouts"] += 1
+        logger.error(f"Timed out after {PG_POOL_ACQUIRE_TIMEOUT}s waiting for a database connection")
+        raise
+    _pool_waits.append((time.perf_counter() - started) * 1000)
+    _pool_stats["acquired"] += 1
+    try:
+        yield conn
+    finally:
+        await db_pool.release(conn)
+
+def get_pool_stats() -> dict:
+    """Pool size and wait-time percentiles (ms) for this worker."""
+    stats = dict(_pool_stats, workers=WORKERS, min_size=PG_POOL_MIN_SIZE, max_size=PG_POOL_MAX_SIZE)
+    if db_pool is not None:
+        stats["size"] = db_pool.get_size()
+        stats["idle"] = db_pool.get_idle_size()
+    waits = sorted(_pool_waits)
+    if waits:
+        stats["wait_ms"] = {
+            "p50": round(waits[len(waits) // 2], 3),
+            "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3),
+            "max": round(waits[-1], 3),
+        }
+    return stats
+
+async def check_service_tables():
+    """Fail fast if the migrations that create the service's own tables have not run."""
+    async with acquire_connection() as conn:
+        missing = [table for table in SERVICE_TABLES
+                   if await conn.fetchval("SELECT to_regclass($1)", table) is None]
+    if missing:
+        raise RuntimeError(f"Missing tables {', '.join(missing)}; run `python -m database.migrations apply` first")
+
+async def purge_idempotency_keys():
+    """Delete expired idempotency keys every IDEMPOTENCY_PURGE_INTERVAL seconds."""
+    while True:
+        try:
+            async with acquire_connection() as conn:
+                status = await conn.execute(PURGE_IDEMPOTENCY_KEYS_SQL, IDEMPOTENCY_TTL_HOURS)
+            logger.info(f"Purged expired idempotency keys ({status})")
+        except Exception as e:
+            logger.warning(f"Idempotency key purge failed: {str(e)}")
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global db_pool
+    db_pool = await asyncpg.create_pool(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASS,
+        min_size=PG_POOL_MIN_SIZE,
+        max_size=PG_POOL_MAX_SIZE,
+        server_settings={"statement_timeout": PG_STATEMENT_TIMEOUT_MS},
+    )
+    logger.info(f"Async Postgres pool opened (max {PG_POOL_MAX_SIZE} connections per worker)")
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS,
-        )
-        return conn
-    except psycopg2.Error as e:
-        logger.error(f"Database connection error: {str(e)}")
+        await check_service_tables()
+    except Exception:
+        await db_pool.close()
         raise
+    purge_task = asyncio.create_task(purge_idempotency_keys())
+    yield
+    purge_task.cancel()
+    await db_pool.close()
+    db_pool = None
 
-def extract_pnr(query: str) -> str:
-    """Extract PNR from the query using regex after 'pnr' (case-insensitive)."""
-    match = re.search(r"pnr[\s:]*([A-Za-z0-9]+)", query, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    return ""
+app = FastAPI(title="Cancel Service", lifespan=lifespan)
 
 @app.get("/health", response_model=HealthCheck)
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/stats")
+async def service_stats():
+    """Connection pool wait times and reservation cache counters for this worker."""
+    return {"pool": get_pool_stats(), "result_cache": result_cache.get_stats(), "etags": reservation_etags.get_stats()}
+
 @app.post("/query")
 async def query(request: QueryRequest):
-    """Handle reservation-related queries."""
-    try:
-        query_text = request.query
+    """Handle reservation-related queries.
 
-        if "status" in query_text.lower() and "pnr" in query_text.lower():
-            pnr = extract_pnr(query_text)
-            if not pnr:
-                return {"error": "PNR not found in the query."}
-            return await get_reservation(pnr)
+    Every PNR, flight ID and passenger name in the request is handled, with one
+    backend call per intent. A request with a single PNR gets the same response
+    as the matching endpoint; anything more gets ``{"results": {intent: ...}}``.
+    """
+    try:
+        actions = parse_query(request.query)
+        if not actions:
+            return {"result": "Please provide a valid reservation query with PNR number"}
 
-        if "cancel" in query_text.lower() and "pnr" in query_text.lower():
-            pnr = extract_pnr(query_text)
-            if not pnr:
-                return {"error": "PNR not found in the query."}
-            return await cancel_reservation(pnr)
+        if len(actions) == 1:
+            intent, values = next(iter(actions.items()))
+            if intent == "status" and len(values) == 1:
+                reservation = await lookup_reservation(values[0])
+                return reservation or {"error": f"No reservation found for PNR: {values[0]}"}
+            if intent == "cancel" and len(values) == 1:
+                return await cancel_reservation(values[0], idempotency_key=None)
 
-        return {"result": "Please provide a valid reservation query with PNR number"}
+        results = {}
+        for intent, values in actions.items():
+            results[intent] = await run_query_action(intent, values)
+        return {"results": results}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing reservation query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def fetch_reservations(sql: str, *args) -> List[dict]:
+    async with acquire_connection() as conn:
+        return [dict(row) for row in await conn.fetch(sql, *args)]
+
+async def cancel_reservations(pnrs: List[str]) -> dict:
+    """Cancel several PNRs in one statement; returns the outcome per PNR."""
+    async with acquire_connection() as conn:
+        rows = await conn.fetch(BATCH_CANCEL_SQL, pnrs)
+    outcomes = {row["pnr"]: row for row in rows}
+    results = {}
+    for pnr in pnrs:
+        row = outcomes.get(pnr)
+        if row is None:
+            results[pnr] = {"error": f"No reservation found for PNR: {pnr}"}
+        elif row["outcome"] == "cancelled":
+            result_cache.invalidate(RESERVATION_TABLE, pnr)
+            results[pnr] = {"message": "Reservation cancelled", "pnr": pnr, "refund_status": row["refund_status"]}
+        else:
+            results[pnr] = {"message": "Reservation already cancelled", "refund_status": row["refund_status"]}
+    return results
+
+async def run_query_action(intent: str, values: List[str]):
+    """Run one parsed /query intent for all of its values in a single backend call."""
+    if intent == "cancel":
+        return await cancel_reservations(values)
+    if intent in ("status", "refund_status"):
+        rows = await fetch_reservations(BATCH_RESERVATION_SQL, values)
+        by_pnr = {str(row.get("PNR_Number", "")).upper(): row for row in rows}
+        results = {}
+        for pnr in values:
+            row = by_pnr.get(pnr)
+            if row is None:
+                results[pnr] = {"error": f"No reservation found for PNR: {pnr}"}
+            elif intent == "refund_status":
+                results[pnr] = {"booking_status": row.get("Booking_Status"), "refund_status": row.get("Refund_Status")}
+            else:
+                results[pnr] = row
+        return results
+    if intent == "flight_lookup":
+        return await fetch_reservations(FLIGHT_RESERVATIONS_SQL, values, QUERY_ROW_LIMIT)
+    if intent == "passenger_lookup":
+        return await fetch_reservations(PASSENGER_RESERVATIONS_SQL, [name.lower() for name in values], QUERY_ROW_LIMIT)
+    raise ValueError(f"Unknown intent: {intent}")
+
+async def load_reservation(pnr: str):
+    """Read one reservation row from Postgres as a dict, or None if it does not exist."""
+    async with acquire_connection() as conn:
+        row = await conn.fetchrow(RESERVATION_SQL, pnr)
+    return dict(row) if row else None
+
+async def lookup_reservation(pnr: str):
+    """Reservation for ``pnr`` through the result cache, or None if it does not exist."""
+    pnr_key = pnr.upper()
+    return await result_cache.aget_or_load(
+        RESERVATION_SQL, [pnr_key],
+        lambda: load_reservation(pnr_key),
+        table=RESERVATION_TABLE,
+        row_key=pnr_key,
+        cacheable=lambda row: row is not None,
+    )
+
+def etag_headers(entry) -> dict:
+    return {"ETag": entry.etag, "Cache-Control": CANCELLED_CACHE_CONTROL if entry.cancelled else ACTIVE_CACHE_CONTROL}
+
 @app.get("/reservations/{pnr}")
-async def get_reservation(pnr: str):
-    """Get reservation details by PNR."""
-    conn = None
+async def get_reservation(pnr: str, if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
+    """Get reservation details by PNR.
+
+    Responses carry a strong ETag; a request whose ``If-None-Match`` still
+    matches is answered 304, usually without reading the reservation.
+    """
+    pnr_key = pnr.upper()
+    if if_none_match:
+        known = reservation_etags.lookup(pnr_key)
+        if known and etag_matches(if_none_match, known.etag):
+            return Response(status_code=304, headers=etag_headers(known))
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM "Flight_reservation" WHERE UPPER("PNR_Number") = %s', (pnr.upper(),))
-        result = cursor.fetchone()
-        colnames = [desc[0] for desc in cursor.description] if cursor.description else []
-        if not result:
-            return {"error": f"No reservation found for PNR: {pnr}"}
-        return dict(zip(colnames, result))
+        versions = reservation_etags.versions(pnr_key)
+        reservation = await lookup_reservation(pnr_key)
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Database error")
-    finally:
-        if conn:
-            conn.close()
+    if not reservation:
+        return {"error": f"No reservation found for PNR: {pnr}"}
+
+    cancelled = str(reservation.get("Booking_Status", "")).lower() == "cancelled"
+    entry = reservation_etags.remember(pnr_key, reservation, cancelled, versions)
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=etag_headers(entry))
+    return JSONResponse(content=jsonable_encoder(reservation), headers=etag_headers(entry))
+
+async def stream_reservations(pnrs: List[str]):
+    """Yield NDJSON lines for every reservation among ``pnrs`` as rows arrive from a
+    single ``= ANY`` query, then one summary line listing the PNRs not found."""
+    found = set()
+    try:
+        async with acquire_connection() as conn:
+            # Server-side cursors need a transaction; rows are fetched 100 at a time
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(BATCH_RESERVATION_SQL, pnrs, prefetch=100):
+                    reservation = dict(row)
+                    pnr = str(reservation.get("PNR_Number", "")).upper()
+                    found.add(pnr)
+                    yield json.dumps({"pnr": pnr, "reservation": reservation}, default=str) + "\n"
+    except Exception as e:
+        logger.error(f"Database error in batch lookup: {str(e)}")
+        yield json.dumps({"error": "Database error"}) + "\n"
+        return
+    not_found = [pnr for pnr in pnrs if pnr not in found]
+    yield json.dumps({"summary": {"requested": len(pnrs), "found": len(found), "not_found": not_found}}) + "\n"
+
+@app.post("/reservations:batch")
+async def get_reservations_batch(request: BatchReservationRequest):
+    """Get many reservations in one round trip, streamed back as NDJSON."""
+    # De-duplicate while keeping the caller's order
+    pnrs = list(dict.fromkeys(pnr.strip().upper() for pnr in request.pnrs if pnr.strip()))
+    if not pnrs:
+        raise HTTPException(status_code=400, detail="No PNRs provided")
+    if len(pnrs) > MAX_BATCH_PNRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PNRS} PNRs per batch")
+    return StreamingResponse(stream_reservations(pnrs), media_type="application/x-ndjson")
 
 @app.post("/cancel/{pnr}")
-async def cancel_reservation(pnr: str):
-    """Cancel reservation by PNR."""
-    conn = None
+async def cancel_reservation(pnr: str, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Cancel reservation by PNR in a single conditional UPDATE.
+
+    With an ``Idempotency-Key`` header, the first response is stored and
+    retries with the same key are answered from it without touching the
+    reservation again. Reusing a key for a different PNR is rejected (422).
+    """
+    pnr_key = pnr.upper()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT "Booking_Status", "Refund_Status" FROM "Flight_reservation" WHERE UPPER("PNR_Number") = %s', (pnr.upper(),))
-        row = cursor.fetchone()
-        if not row:
-            return {"error": f"No reservation found for PNR: {pnr}"}
-        if row[0].lower() == "cancelled":
-            return {"message": "Reservation already cancelled", "refund_status": row[1]}
-        # Update the status
-        cursor.execute(
-            'UPDATE "Flight_reservation" SET "Booking_Status" = %s, "Refund_Status" = %s WHERE UPPER("PNR_Number") = %s',
-            ("Cancelled", "Refunded", pnr.upper())
-        )
-        conn.commit()
-        return {"message": "Reservation cancelled", "pnr": pnr, "refund_status": "Refunded"}
+        async with acquire_connection() as conn:
+            async with conn.transaction():
+                if idempotency_key:
+                    claimed = await conn.fetchval(CLAIM_IDEMPOTENCY_KEY_SQL, idempotency_key, pnr_key,
+                                                  IDEMPOTENCY_TTL_HOURS)
+                    if not claimed:
+                        prior = await conn.fetchrow(PRIOR_IDEMPOTENT_RESPONSE_SQL, idempotency_key)
+                        if prior["pnr"] != pnr_key:
+                            raise HTTPException(status_code=422,
+                                                detail="Idempotency-Key was already used for another PNR")
+                        return json.loads(prior["response"])
+
+                row = await conn.fetchrow(CANCEL_SQL, pnr_key)
+                outcome = row["outcome"] if row else "not_found"
+                if outcome == "cancelled":
+                    response = {"message": "Reservation cancelled", "pnr": pnr, "refund_status": row["refund_status"]}
+                elif outcome == "already_cancelled":
+                    response = {"message": "Reservation already cancelled", "refund_status": row["refund_status"]}
+                else:
+                    response = {"error": f"No reservation found for PNR: {pnr}"}
+
+                if idempotency_key:
+                    await conn.execute(SAVE_IDEMPOTENT_RESPONSE_SQL, idempotency_key, json.dumps(response))
+        if outcome == "cancelled":
+            result_cache.invalidate(RESERVATION_TABLE, pnr_key)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Database error")
-    finally:
-        if conn:
-            conn.close()
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def stream_disruption_cancel(flight_id: str, travel_date: Optional[date], batch_size: int):
+    """Cancel every active reservation on a flight in batched transactions, yielding
+    server-sent events: ``start``, one ``batch`` per committed batch, then ``done``."""
+    day = travel_date.isoformat() if travel_date else None
+    job_id = f"{flight_id}:{day or 'all'}"
+    try:
+        async with acquire_connection() as conn:
+            job = await conn.fetchrow(START_DISRUPTION_JOB_SQL, job_id, flight_id, day)
+            after, total, batches = job["last_pnr"], job["cancelled"], job["batches"]
+            yield sse_event("start", {"job_id": job_id, "flight_id": flight_id, "travel_date": day,
+                                      "resumed": job["resumed"], "resume_after": after or None,
+                                      "cancelled_so_far": total})
+
+            db_seconds = 0.0
+            while True:
+                # One statement per batch, so each batch commits on its own
+                started = time.perf_counter()
+                row = await conn.fetchrow(DISRUPTION_BATCH_SQL, job_id, flight_id, travel_date, after, batch_size)
+                elapsed = time.perf_counter() - started
+                db_seconds += elapsed
+                if not row["selected"]:
+                    break
+                after, total = row["last_pnr"], row["cancelled"]
+                batches += 1
+                pnrs = list(row["pnrs"] or [])
+                for pnr in pnrs:
+                    # Per PNR, so other cached reservations stay valid
+                    result_cache.invalidate(RESERVATION_TABLE, pnr.upper())
+                yield sse_event("batch", {"batch": batches, "cancelled": len(pnrs), "pnrs": pnrs,
+                                          "total_cancelled": total, "db_ms": round(elapsed * 1000, 2)})
+
+            await conn.execute(
+                "UPDATE disruption_jobs SET status = 'completed', updated_at = now() WHERE job_id = $1", job_id
+            )
+        yield sse_event("done", {"job_id": job_id, "total_cancelled": total, "batches": batches,
+                                 "db_ms": round(db_seconds * 1000, 2)})
+    except Exception as e:
+        logger.error(f"Disruption cancellation of {flight_id} failed: {str(e)}")
+        yield sse_event("error", {"job_id": job_id, "detail": "Database error; re-run to resume"})
+
+@app.post("/flights/{flight_id}/cancel")
+async def cancel_flight(flight_id: str, travel_date: Optional[date] = None, batch_size: int = DISRUPTION_BATCH_SIZE):
+    """Cancel and refund every reservation on ``flight_id`` (optionally only on ``travel_date``),
+    streaming progress as server-sent events. Re-running an interrupted job resumes it."""
+    batch_size = max(1, min(batch_size, 5000))
+    return StreamingResponse(
+        stream_disruption_cancel(flight_id.strip().upper(), travel_date, batch_size),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 if __name__ == "__main__":
     import uvicorn
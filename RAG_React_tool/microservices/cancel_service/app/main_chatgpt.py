@@ -1,20 +1,24 @@
 # sql-tool/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from pydantic import BaseModel
 
 import os
 import sys
 
-try:
-    from RAG_React_tool.Cancel_tool.sql_tool import get_sql_tool
-except:
-    print((os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
-    sys.path.append((os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
-    from Cancel_tool.sql_tool import get_sql_tool
+# Prefer this service's Cancel_tool package (it carries the async tool)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Cancel_tool.async_sql_tool import AsyncSQLTool
 
-app = FastAPI()
+sql_tool = AsyncSQLTool()
 
-sql_tool_func = get_sql_tool()["func"]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await sql_tool.open()
+    yield
+    await sql_tool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 class QueryInput(BaseModel):
     question: str
@@ -22,7 +26,7 @@ class QueryInput(BaseModel):
 @app.post("/query")
 async def sql_tool_query(input: QueryInput):
     try:
-        response = sql_tool_func(input.question)
+        response = await sql_tool.acall(input.question)
         return {"response": response}
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,209 @@
+"""
+Query Parser Module
+
+Parses free-text reservation requests for cancel_service ``/query`` in one
+pass. A single compiled pattern finds intent keywords (cancel, refund status,
+status) and entities (PNRs, flight IDs, passenger names) left to right; each
+entity is attached to the intent keyword before it, or to the first one
+after it when the request leads with the entity ("PNR AB1234 status?").
+Lists are understood ("cancel PNR AB1234, CD5678 and PNR EF9012"), so every
+PNR in a request is handled instead of only the first.
+
+Cancelling cannot be undone, so "cancel" is only an action when it is an
+imperative: it opens its clause ("Cancel ...", "..., and cancel ...",
+"Please cancel ...", "I want to cancel ...") and its sentence has no
+negation, question or policy cue. Anything else ("Don't cancel PNR AB1234",
+"How do I cancel PNR AB1234?", "the cancellation policy for PNR AB1234") is
+read as a status request.
+
+Intents:
+    cancel, refund_status, status  -- PNRs
+    flight_lookup                  -- flight IDs
+    passenger_lookup               -- passenger names
+
+Run ``python -m app.query_parser --queries 200000`` to benchmark the parser
+against the old keyword chain on a synthetic corpus.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+_PNR = r"(?=[A-Za-z]*\d)[A-Za-z0-9]{4,10}\b"
+_FLIGHT = r"[A-Za-z0-9]{2}\d{2,4}\b"
+_SEP = r"\s*(?:,\s*(?:and\b)?|\band\b|&|/)\s*"
+
+QUERY_PATTERN = re.compile(
+    rf"""
+      (?P<refund>\brefund(?:s|ed)?(?:\s+status)?\b)
+    | (?P<cancel>\bcancel(?:lation|ling|s)?\b)
+    | (?P<status>\b(?:status|details?|cancelled|confirmed|check|show)\b)
+    | \bpnrs?(?:\s+(?:numbers?|nos?\b\.?))?[\s:#]*
+      (?P<pnrs>{_PNR}(?:{_SEP}(?:pnr(?:\s+(?:number|no\b\.?))?[\s:#]*)?{_PNR})*)
+    | \bflights?(?:\s+(?:ids?|numbers?|nos?\b\.?))?[\s:#]*
+      (?P<flights>{_FLIGHT}(?:{_SEP}(?:flight\s*)?{_FLIGHT})*)
+    | \b(?:named|passengers?|customers?|names?)[\s:]+
+      (?P<name>(?-i:[A-Z][a-zA-Z'\-]+(?:\s+[A-Z][a-zA-Z'\-]+)?))
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+# Sentence ends; "PNR no. AB1234" does not end one
+SENTENCE_END = re.compile(r"[!?;\n]|(?<!\bno)(?<!\bnos)\.(?=\s|$)", re.IGNORECASE)
+# Negation, question and policy cues that keep "cancel" in a sentence from being an action
+READ_CUE = re.compile(
+    r"\?|\b(?:don[’']?t|do\s+not|never|not|no\s+need|policy|policies|rules?|terms|how|what|why|when|whether|if"
+    r"|should|(?:can|could|may|might|would|will|shall)\s+(?:i|we|you))\b",
+    re.IGNORECASE,
+)
+# What may come between the start of a clause and an imperative "cancel"
+IMPERATIVE_LEAD = re.compile(
+    r"(?:^|[,:]|\b(?:and|then|also|yes|ok(?:ay)?)\b)\s*"
+    r"(?:(?:please|kindly|now|just)\s+|(?:i\s+(?:want|need|would\s+like)|i'd\s+like)\s+to\s+|go\s+ahead\s+and\s+)*$",
+    re.IGNORECASE,
+)
+PNR_CODE = re.compile(_PNR)
+FLIGHT_CODE = re.compile(_FLIGHT)
+
+# Which action an entity becomes under each intent keyword
+PNR_INTENTS = {"cancel": "cancel", "refund": "refund_status", "status": "status"}
+
+
+def _sentence_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Bounds of the sentence containing ``text[start:end]``, closing punctuation included."""
+    sentence_start = 0
+    for boundary in SENTENCE_END.finditer(text, 0, start):
+        sentence_start = boundary.end()
+    boundary = SENTENCE_END.search(text, end)
+    return sentence_start, boundary.end() if boundary else len(text)
+
+
+def is_imperative_cancel(text: str, match) -> bool:
+    """Whether the cancel keyword ``match`` asks for a cancellation rather than mentions one."""
+    if match.group(0).lower() != "cancel":
+        return False
+    sentence_start, sentence_end = _sentence_span(text, match.start(), match.end())
+    if READ_CUE.search(text, sentence_start, sentence_end):
+        return False
+    return bool(IMPERATIVE_LEAD.search(text[sentence_start:match.start()]))
+
+
+def parse_query(text: str) -> Dict[str, List[str]]:
+    """Parse a request into ``{intent: [values]}``, in order of first appearance.
+
+    PNRs and flight IDs are upper-cased and de-duplicated per intent. An empty
+    dict means nothing actionable was found.
+    """
+    actions: Dict[str, List[str]] = {}
+    pending: List[str] = []  # PNRs seen before any intent keyword
+    current: Optional[str] = None
+
+    def add(intent: str, value: str):
+        values = actions.setdefault(intent, [])
+        if value not in values:
+            values.append(value)
+
+    for match in QUERY_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "cancel" and not is_imperative_cancel(text, match):
+            kind = "status"
+        if kind in PNR_INTENTS:
+            current = kind
+            for pnr in pending:
+                add(PNR_INTENTS[current], pnr)
+            pending.clear()
+        elif kind == "pnrs":
+            pnrs = [code.upper() for code in PNR_CODE.findall(match.group("pnrs"))]
+            if current is None:
+                pending.extend(pnrs)
+            else:
+                for pnr in pnrs:
+                    add(PNR_INTENTS[current], pnr)
+        elif kind == "flights":
+            for flight_id in FLIGHT_CODE.findall(match.group("flights")):
+                add("flight_lookup", flight_id.upper())
+        elif kind == "name":
+            add("passenger_lookup", match.group("name").strip())
+
+    # A bare PNR with no intent keyword is a status request
+    for pnr in pending:
+        add("status", pnr)
+    return actions
+
+
+def _legacy_parse(text: str) -> Dict[str, List[str]]:
+    """The keyword chain /query used before, kept as the benchmark baseline."""
+    lowered = text.lower()
+    match = re.search(r"pnr[\s:]*([A-Za-z0-9]+)", text, re.IGNORECASE)
+    pnr = match.group(1) if match else ""
+    if "status" in lowered and "pnr" in lowered and pnr:
+        return {"status": [pnr.upper()]}
+    if "cancel" in lowered and "pnr" in lowered and pnr:
+        return {"cancel": [pnr.upper()]}
+    return {}
+
+
+def _synthetic_corpus(size: int, seed: int = 7):
+    """Yield (query, expected actions) pairs built from request templates."""
+    import random
+    import string
+
+    rng = random.Random(seed)
+    first = ["Rajiv", "Anita", "Barclay", "Meera", "Arjun", "Sana"]
+    last = ["Kumar", "Sharma", "Moylane", "Iyer", "Khan", "Das"]
+
+    def pnr():
+        return "".join(rng.choices(string.ascii_uppercase, k=2)) + "".join(rng.choices(string.digits, k=4))
+
+    def flight():
+        return rng.choice(["AI", "6E", "UK", "SG"]) + str(rng.randint(100, 9999))
+
+    def joined(items):
+        return items[0] if len(items) == 1 else ", ".join(items[:-1]) + " and PNR " + items[-1]
+
+    templates = [
+        lambda p: (f"What is the status of PNR {p[0]}?", {"status": p[:1]}),
+        lambda p: (f"Cancel my reservation for PNR number {p[0]}", {"cancel": p[:1]}),
+        lambda p: (f"Cancel PNR {joined(p)}", {"cancel": p}),
+        lambda p: (f"What is the refund status for PNR {p[0]}?", {"refund_status": p[:1]}),
+        lambda p: (f"Cancel PNR {p[0]} and show the status of PNR {p[1]}", {"cancel": p[:1], "status": p[1:2]}),
+        lambda p: (f"PNR {p[0]} details please", {"status": p[:1]}),
+    ]
+    for _ in range(size):
+        pnrs = list(dict.fromkeys(pnr() for _ in range(rng.randint(2, 4))))
+        kind = rng.randrange(len(templates) + 2)
+        if kind < len(templates):
+            yield templates[kind](pnrs)
+        elif kind == len(templates):
+            name = f"{rng.choice(first)} {rng.choice(last)}"
+            yield f"List all bookings made by passenger named {name}", {"passenger_lookup": [name]}
+        else:
+            flight_id = flight()
+            yield f"Who is booked on flight {flight_id}?", {"flight_lookup": [flight_id.upper()]}
+
+
+def benchmark(size: int) -> Dict[str, Dict[str, float]]:
+    """Parse a synthetic corpus with both parsers; report throughput and exact-match accuracy."""
+    import time
+
+    corpus = list(_synthetic_corpus(size))
+    results = {}
+    for label, parser in (("compiled", parse_query), ("legacy", _legacy_parse)):
+        started = time.perf_counter()
+        parsed = [parser(query) for query, _ in corpus]
+        elapsed = time.perf_counter() - started
+        correct = sum(result == expected for result, (_, expected) in zip(parsed, corpus))
+        results[label] = {
+            "queries_per_second": round(len(corpus) / elapsed),
+            "us_per_query": round(elapsed / len(corpus) * 1e6, 2),
+            "accuracy": round(correct / len(corpus), 4),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the /query request parser")
+    parser.add_argument("--queries", type=int, default=100000, help="Synthetic corpus size")
+    args = parser.parse_args()
+    for label, stats in benchmark(args.queries).items():
+        print(f"{label:>8}: {stats['queries_per_second']:>9} queries/s  "
+              f"{stats['us_per_query']:>7} us/query  accuracy {stats['accuracy']:.2%}")
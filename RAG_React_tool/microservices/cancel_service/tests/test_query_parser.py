@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.query_parser import parse_query
+
+
+@pytest.mark.parametrize("query", [
+    "What is the status of cancellation for PNR AB1234?",
+    "Don't cancel PNR AB1234, just check its status",
+    "Do not cancel PNR AB1234",
+    "What is the cancellation policy for PNR AB1234?",
+    "How do I cancel PNR AB1234?",
+    "Can I cancel PNR AB1234?",
+    "Should I cancel my booking PNR AB1234?",
+    "Can you cancel PNR AB1234?",
+    "I am thinking to cancel PNR AB1234",
+    "Cancel PNR AB1234?",
+])
+def test_mentions_of_cancelling_are_read_only(query):
+    assert parse_query(query) == {"status": ["AB1234"]}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Cancel PNR AB1234", {"cancel": ["AB1234"]}),
+    ("Please cancel PNR AB1234.", {"cancel": ["AB1234"]}),
+    ("I want to cancel PNR AB1234", {"cancel": ["AB1234"]}),
+    ("Yes, go ahead and cancel PNR AB1234.", {"cancel": ["AB1234"]}),
+    ("Cancel PNR AB1234, CD5678 and PNR EF9012", {"cancel": ["AB1234", "CD5678", "EF9012"]}),
+    ("Check PNR AB1234 and cancel PNR CD5678", {"status": ["AB1234"], "cancel": ["CD5678"]}),
+])
+def test_imperative_cancel(query, expected):
+    assert parse_query(query) == expected
+
+
+def test_question_in_another_sentence_does_not_block_cancel():
+    assert parse_query("Cancel PNR AB1234. What is the refund status for PNR CD5678?") == {
+        "cancel": ["AB1234"], "refund_status": ["CD5678"]}
+
+
+def test_cue_in_the_same_sentence_wins_over_cancel():
+    assert parse_query("Cancel PNR AB1234 if the policy allows a refund") == {"status": ["AB1234"]}
+
+
+def test_pnr_abbreviation_does_not_end_the_sentence():
+    assert parse_query("Cancel PNR no. AB1234") == {"cancel": ["AB1234"]}
@@ -13,9 +13,19 @@ if not vectorstore_loaded:
     rag.setup_vectorstore(force_recreate=True)
     vectorstore_loaded = True
 
+# Bumped by every reindex; clients (e.g. rag_service's answer cache) watch index_version
+reindex_count = 0
+
+def index_version():
+    if not rag.vectorstore:
+        return None
+    collection = rag.vectorstore._collection
+    return f"{collection.id}:{collection.count()}:{reindex_count}"
+
 @app.get("/chroma/status")
 def status():
-    return {"status": "ChromaDB is running", "vectorstore_loaded": vectorstore_loaded}
+    return {"status": "ChromaDB is running", "vectorstore_loaded": vectorstore_loaded,
+            "index_version": index_version()}
 
 @app.get("/chroma/docs")
 def docs():
@@ -31,9 +41,10 @@ def docs():
 def reindex():
     try:
         rag.setup_vectorstore(force_recreate=True)
-        global vectorstore_loaded
+        global vectorstore_loaded, reindex_count
         vectorstore_loaded = True
-        return {"status": "Reindexed"}
+        reindex_count += 1
+        return {"status": "Reindexed", "index_version": index_version()}
     except Exception as e:
         return {"error": str(e)}
 
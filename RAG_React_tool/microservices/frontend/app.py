@@ -1,11 +1,14 @@
 import gradio as gr
 import httpx
 import asyncio
-from typing import List, Tuple
+import json
+from typing import AsyncIterator, List, Tuple
 
 # Configuration
 import os
 AGENT_SERVICE_URL = os.getenv("AGENT_SERVICE_URL", "http://localhost:8004/chat")
+# Server-sent events endpoint of the agent; the answer is rendered as it streams in
+AGENT_STREAM_URL = os.getenv("AGENT_STREAM_URL", "http://localhost:8004/react-agent/stream")
 
 async def query_agent(question: str) -> str:
     """Send query to the agent service and return the response."""
@@ -22,6 +25,38 @@ async def query_agent(question: str) -> str:
     except Exception as e:
         return f"Error querying agent service: {str(e)}"
 
+class StreamUnavailable(Exception):
+    """The agent's streaming endpoint could not be reached or does not exist."""
+
+async def stream_agent(question: str) -> AsyncIterator[Tuple[str, dict]]:
+    """Post the query to the agent's streaming endpoint and yield (event, data) pairs.
+
+    Raises:
+        StreamUnavailable: If the stream could not be opened, before the agent ran
+    """
+    # No read timeout: tokens may pause while a tool runs; the agent closes the stream when done
+    timeout = httpx.Timeout(10.0, read=None)
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        try:
+            request = client.build_request("POST", AGENT_STREAM_URL, json={"question": question})
+            response = await client.send(request, stream=True)
+        except httpx.ConnectError as e:
+            raise StreamUnavailable(str(e)) from e
+        try:
+            if response.status_code in (404, 405):
+                raise StreamUnavailable(f"{AGENT_STREAM_URL} returned {response.status_code}")
+            response.raise_for_status()
+            event = "message"
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):].strip())
+                elif not line:
+                    event = "message"
+        finally:
+            await response.aclose()
+
 def create_interface():
     with gr.Blocks(title="Flight Assistant") as demo:
         gr.Markdown("""
@@ -38,14 +73,37 @@ def create_interface():
         )
         clear = gr.Button("Clear Conversation")
 
-        # async handler so we can await query_agent()
+        # async generator so the reply is shown while the agent streams it
         async def respond(message: str, chat_history: List[Tuple[str, str]]):
             if not message.strip():
-                return "", chat_history, chat_history  # no-op
+                yield "", chat_history, chat_history  # no-op
+                return
+
+            status, answer = "", ""
+            try:
+                async for event, data in stream_agent(message):
+                    if event == "status":
+                        status = f"_{data.get('message', '')}_"
+                    elif event == "token":
+                        answer += data.get("text", "")
+                    elif event == "done":
+                        answer = data.get("answer") or answer or "No answer received"
+                    elif event == "error":
+                        answer = f"Error querying agent service: {data.get('error')}"
+                    else:
+                        continue
+                    # Show the latest status until the first answer token arrives
+                    updated_history = chat_history + [(message, answer or status)]
+                    yield "", updated_history, updated_history
+            except StreamUnavailable:
+                # No streaming endpoint (e.g. an older agent); the agent has not run, so ask it once the blocking way
+                answer = await query_agent(message)
+            except Exception as e:
+                # The agent may already have run tools (even a cancellation), so never re-run it here
+                answer = (answer + "\n\n" if answer else "") + f"[Response interrupted: {str(e)}]"
 
-            bot_reply = await query_agent(message)
-            updated_history = chat_history + [(message, bot_reply)]
-            return "", updated_history, updated_history
+            updated_history = chat_history + [(message, answer or "No answer received")]
+            yield "", updated_history, updated_history
 
         msg.submit(respond, [msg, state], [msg, chatbot, state])
         clear.click(lambda: ([], []), None, [chatbot, state], queue=False)
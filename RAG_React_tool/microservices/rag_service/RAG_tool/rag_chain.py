@@ -48,7 +48,7 @@ class RAGPipeline:
         """Create the prompt template for the RAG pipeline."""
         template = """Use the following pieces of context to answer the question at the end.
         If you don't know the answer, just say that you don't know, don't try to make up an answer.
-        Always provide the citation for your answer.
+        Always provide the citation for your answer, using the bracketed source labels ([1], [2], ...) in the context.
         Always say "Let me know if you need further help" at the end of the answer.
 
         Context: {context}
@@ -0,0 +1,191 @@
+"""
+Context Packer Module
+
+Builds the prompt context for rag_service from retrieved chunks. Chunks are
+split with an overlap, so neighbours retrieved together repeat text. This
+stage:
+
+1. merges chunks from the same source when one ends with the text the
+   other starts with (or contains it outright);
+2. drops sentences that already appeared in a higher-ranked block;
+3. fills a token budget, counted with the target model's tokenizer, in
+   retrieval (score) order, truncating the last block that fits partially;
+4. labels each block ``[n] source, p. page`` so the answer can cite it.
+"""
+import os
+import re
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+# Longest overlap searched for when merging neighbours; the loaders use CHUNK_OVERLAP = 200 characters
+MAX_MERGE_OVERLAP = int(os.getenv("MAX_MERGE_OVERLAP", "400"))
+MIN_MERGE_OVERLAP = 20
+# A block is only truncated into the remaining budget if at least this many tokens fit
+MIN_PARTIAL_TOKENS = 50
+
+
+class ContextBlock(NamedTuple):
+    label: str
+    text: str
+    tokens: int
+    chunk_ids: List[str]
+
+
+class PackedContext(NamedTuple):
+    text: str
+    blocks: List[ContextBlock]
+    tokens: int
+    input_tokens: int  # tokens in the raw chunks before merging, deduplication and the budget
+
+
+def get_encoding(model_name: str = None):
+    """Tokenizer for ``model_name`` (tiktoken), falling back to a ~4 characters per token estimate."""
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model_name or os.getenv("MODEL_NAME", "gpt-4o"))
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return encoding
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+        return None
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    limit = min(len(left), len(right), MAX_MERGE_OVERLAP)
+    for size in range(limit, MIN_MERGE_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _label(metadata: Dict[str, Any]) -> Optional[str]:
+    source = metadata.get("source") or metadata.get("file_name")
+    if not source:
+        return None
+    source = os.path.basename(str(source))
+    page = metadata.get("page")
+    if isinstance(page, int):
+        # PDF loaders number pages from 0
+        return f"{source}, p. {page + 1}"
+    return f"{source}, p. {page}" if page else source
+
+
+class _Span:
+    def __init__(self, chunk: Dict[str, Any], rank: int):
+        self.text = _normalize(chunk.get("text", ""))
+        self.metadata = chunk.get("metadata") or {}
+        self.source = self.metadata.get("source")
+        self.rank = rank
+        self.ids = [str(chunk["id"])] if chunk.get("id") is not None else []
+        self.pages = [self.metadata.get("page")]
+
+    def absorb(self, other: "_Span") -> bool:
+        """Merge ``other`` into this span if they overlap; True if merged."""
+        if other.text in self.text:
+            pass
+        elif self.text in other.text:
+            self.text = other.text
+        elif _overlap(self.text, other.text):
+            self.text += other.text[_overlap(self.text, other.text):]
+        elif _overlap(other.text, self.text):
+            self.text = other.text + self.text[_overlap(other.text, self.text):]
+        else:
+            return False
+        self.rank = min(self.rank, other.rank)
+        self.ids += other.ids
+        self.pages += other.pages
+        return True
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a deduplicated, labelled, token-budgeted context."""
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, model_name: str = None):
+        """
+        Initialize the packer.
+
+        Args:
+            token_budget: Maximum context tokens
+            model_name: Model whose tokenizer counts tokens (defaults to MODEL_NAME)
+        """
+        self.token_budget = token_budget
+        self.encoding = get_encoding(model_name)
+
+    def count_tokens(self, text: str) -> int:
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text))
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        if self.encoding is None:
+            return text[:tokens * 4]
+        return self.encoding.decode(self.encoding.encode(text)[:tokens])
+
+    def _merge(self, chunks: List[Dict[str, Any]]) -> List[_Span]:
+        spans: List[_Span] = []
+        for rank, chunk in enumerate(chunks):
+            span = _Span(chunk, rank)
+            if not span.text:
+                continue
+            # Absorbing can make a span overlap another one, so merge until nothing changes
+            merged = True
+            while merged:
+                merged = False
+                for existing in spans:
+                    if existing.source == span.source and existing.absorb(span):
+                        spans.remove(existing)
+                        span = existing
+                        merged = True
+                        break
+            spans.append(span)
+        return sorted(spans, key=lambda span: span.rank)
+
+    def pack(self, chunks: List[Dict[str, Any]]) -> PackedContext:
+        """Pack ``chunks`` (best first) into the prompt context."""
+        input_tokens = sum(self.count_tokens(chunk.get("text", "")) for chunk in chunks)
+        blocks: List[ContextBlock] = []
+        seen_sentences = set()
+        used = 0
+        for span in self._merge(chunks):
+            # Drop sentences a higher-ranked block already carries
+            parts = [part for part in re.split(r"(?<=[.!?])\s+", span.text) if part]
+            kept = []
+            for part in parts:
+                key = part.lower()
+                if len(key) > 30 and key in seen_sentences:
+                    continue
+                seen_sentences.add(key)
+                kept.append(part)
+            text = " ".join(kept)
+            if not text:
+                continue
+
+            number = len(blocks) + 1
+            label = _label(dict(span.metadata, page=span.pages[0])) or (f"chunk {span.ids[0]}" if span.ids else "source")
+            header = f"[{number}] {label}\n"
+            header_tokens = self.count_tokens(header)
+            tokens = self.count_tokens(text)
+            remaining = self.token_budget - used - header_tokens
+            if tokens > remaining:
+                if remaining < MIN_PARTIAL_TOKENS:
+                    break
+                text = self._truncate(text, remaining)
+                tokens = self.count_tokens(text)
+            blocks.append(ContextBlock(f"[{number}] {label}", text, header_tokens + tokens, span.ids))
+            used += header_tokens + tokens
+            if used >= self.token_budget:
+                break
+
+        context = "\n\n".join(f"{block.label}\n{block.text}" for block in blocks)
+        return PackedContext(context, blocks, used, input_tokens)
@@ -1,9 +1,13 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import sys
 import os
-import requests
-from typing import List, Dict, Any
+import json
+import time
+import asyncio
+from typing import List, Dict, Any, Optional
 
 # Add project root to Python path (go up three levels from current file)
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
@@ -18,32 +22,81 @@ except ImportError as e:
     print(f"Current sys.path: {sys.path}")
     raise
 
-app = FastAPI()
+try:
+    from .retriever import RetrievalError, create_retriever, load_embedding_function
+    from .semantic_cache import SemanticCache, unit_vector
+    from .context_packer import ContextPacker
+except ImportError:
+    from retriever import RetrievalError, create_retriever, load_embedding_function
+    from semantic_cache import SemanticCache, unit_vector
+    from context_packer import ContextPacker
+
+# RETRIEVAL_MODE selects the Chroma service over pooled HTTP ("http") or the
+# collection opened in-process ("embedded"); see app/retriever.py
+retriever = create_retriever()
+
+# Semantic answer cache: reworded repeats of a question are answered without Chroma or the LLM
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_VERSION_POLL = float(os.getenv("SEMANTIC_CACHE_VERSION_POLL", "30"))
+answer_cache: Optional[SemanticCache] = None
+
+# /search:batch limits: questions per request, and LLM generations in flight per batch
+RAG_BATCH_MAX_QUESTIONS = int(os.getenv("RAG_BATCH_MAX_QUESTIONS", "100"))
+RAG_BATCH_CONCURRENCY = int(os.getenv("RAG_BATCH_CONCURRENCY", "8"))
+NO_RESULTS_RESPONSE = "No relevant information found in the knowledge base."
+
+async def refresh_index_version():
+    """Pass the current index version to the answer cache, which drops its entries when it changes."""
+    try:
+        answer_cache.set_version(await retriever.index_version())
+    except Exception as e:
+        print(f"Could not read the index version: {str(e)}")
+
+async def watch_index_version():
+    while True:
+        await refresh_index_version()
+        await asyncio.sleep(SEMANTIC_CACHE_VERSION_POLL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global answer_cache
+    await retriever.open()
+    watcher = None
+    if SEMANTIC_CACHE_ENABLED:
+        # Embedded mode already holds the index's embedding model; HTTP mode loads its own
+        embed = getattr(retriever, "embedding_function", None) or await asyncio.to_thread(load_embedding_function)
+        answer_cache = SemanticCache(
+            embed,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+        )
+        watcher = asyncio.create_task(watch_index_version())
+    yield
+    if watcher:
+        watcher.cancel()
+    await retriever.close()
 
-# ChromaDB server configuration from environment variables (ConfigMap in K8s)
-CHROMA_SERVER = os.getenv("CHROMA_SERVER_HOST", "http://localhost:8000")
-CHROMA_QUERY_ENDPOINT = os.getenv("CHROMA_QUERY_ENDPOINT", f"{CHROMA_SERVER}/chroma/query")
-CHROMA_STATUS_ENDPOINT = os.getenv("CHROMA_STATUS_ENDPOINT", f"{CHROMA_SERVER}/chroma/status")
+app = FastAPI(lifespan=lifespan)
 
-print("FastAPI app initialized")
+print(f"FastAPI app initialized (retrieval mode: {retriever.mode})")
 
 class QueryInput(BaseModel):
     question: str
     top_k: int = 3  # Number of chunks to retrieve
 
-def query_chroma_server(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+class BatchQueryInput(BaseModel):
+    questions: List[str]
+    top_k: int = 3  # Number of chunks to retrieve per question
+
+async def query_chroma(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
     """
-    Query the ChromaDB server for relevant document chunks
+    Retrieve relevant document chunks from ChromaDB
     """
     try:
-        response = requests.get(
-            CHROMA_QUERY_ENDPOINT,
-            params={"q": query, "top_k": top_k}
-        )
-        response.raise_for_status()
-        return response.json().get("results", [])
-    except requests.RequestException as e:
-        print(f"Error querying ChromaDB server: {str(e)}")
+        return await retriever.search(query, top_k)
+    except RetrievalError as e:
+        print(f"Error querying ChromaDB: {str(e)}")
         return []
 
 # Initialize RAG pipeline
@@ -51,53 +104,244 @@ try:
     print("Initializing RAG pipeline...")
     rag_pipeline = RAGPipeline()
     rag_chain = rag_pipeline.create_rag_chain()
+    # Merges overlapping chunks and caps the context at CONTEXT_TOKEN_BUDGET tokens of the model's tokenizer
+    context_packer = ContextPacker(model_name=rag_pipeline.model_name)
     print("✓ RAG pipeline initialized successfully")
 except Exception as e:
     print(f"✗ Error initializing RAG pipeline: {str(e)}")
     raise
 
+async def generate_answer(question: str, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pack ``chunks`` into the context and generate the answer to ``question``."""
+    # Pack the chunks into a deduplicated, labelled context within the token budget
+    packed = context_packer.pack(chunks)
+    print(f"Packed {len(chunks)} chunks into {len(packed.blocks)} blocks "
+          f"({packed.tokens} of {packed.input_tokens} tokens)")
+    result = await rag_chain.ainvoke({
+        "question": question,
+        "context": packed.text
+    })
+    return {
+        "response": result,
+        "sources": chunks,  # Include the source chunks for reference
+        "citations": [{"label": block.label, "chunk_ids": block.chunk_ids} for block in packed.blocks],
+        "context_tokens": packed.tokens,
+    }
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def cached_response(hit) -> Dict[str, Any]:
+    return {
+        "response": hit.entry.answer,
+        "sources": hit.entry.sources,
+        "citations": hit.entry.citations,
+        "context_tokens": hit.entry.context_tokens,
+        "cached": True,
+        "similarity": round(hit.similarity, 4),
+    }
+
 @app.get("/chroma/status")
 async def chroma_status():
     """Check if ChromaDB server is running"""
     try:
-        response = requests.get(CHROMA_STATUS_ENDPOINT)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        status = await retriever.status()
+        if answer_cache and status.get("index_version"):
+            answer_cache.set_version(status["index_version"])
+        return status
+    except RetrievalError as e:
         raise HTTPException(status_code=500, detail=f"ChromaDB server error: {str(e)}")
 
+@app.get("/retriever/stats")
+async def retriever_stats():
+    """Retrieval mode and request, retry and error counters"""
+    return retriever.get_stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Semantic answer cache hit rate, latency saved and index version"""
+    if not answer_cache:
+        return {"enabled": False}
+    return dict(answer_cache.get_stats(), enabled=True)
+
 @app.post("/search")
 async def rag_tool_search(input: QueryInput):
     print(f"Received search query: {input.question}")
 
     try:
+        started = time.perf_counter()
+        # 0. Serve a reworded repeat of an answered question from the semantic cache
+        embedding = None
+        if answer_cache:
+            embedding, = await answer_cache.aembed([input.question])
+            hit = answer_cache.lookup(embedding, input.top_k)
+            if hit:
+                answer_cache.record_saving(hit.entry.cost_ms - (time.perf_counter() - started) * 1000)
+                print(f"✓ Semantic cache hit (similarity {hit.similarity:.3f})")
+                return cached_response(hit)
+
         # 1. First retrieve relevant chunks from ChromaDB
         print(f"Querying ChromaDB for relevant chunks...")
-        chunks = query_chroma_server(input.question, input.top_k)
+        chunks = await query_chroma(input.question, input.top_k)
 
         if not chunks:
-            return {"response": "No relevant information found in the knowledge base."}
+            return {"response": NO_RESULTS_RESPONSE}
 
-        # 2. Format the context from chunks
-        context = "\n\n".join([chunk.get("text", "") for chunk in chunks])
-
-        # 3. Generate response using the RAG chain with the retrieved context
+        # 2. Generate response using the RAG chain with the retrieved context
         print("Generating response with RAG...")
-        result = rag_chain.invoke({
-            "question": input.question,
-            "context": context
-        })
+        answer = await generate_answer(input.question, chunks)
 
         print("✓ Response generated successfully")
-        return {
-            "response": result,
-            "sources": chunks  # Include the source chunks for reference
-        }
+        if answer_cache:
+            answer_cache.store(input.question, embedding, input.top_k, answer["response"], chunks,
+                               cost_ms=(time.perf_counter() - started) * 1000,
+                               citations=answer["citations"], context_tokens=answer["context_tokens"])
+        return answer
 
     except Exception as e:
         print(f"Error in rag_tool_search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+async def stream_answer(question: str, top_k: int):
+    """Yield server-sent events for one question: ``status`` as the pipeline
+    progresses, ``sources`` once the context is packed, ``token`` for each
+    piece of the generated answer, then ``done`` with the full answer."""
+    started = time.perf_counter()
+    try:
+        embedding = None
+        if answer_cache:
+            embedding, = await answer_cache.aembed([question])
+            hit = answer_cache.lookup(embedding, top_k)
+            if hit:
+                answer_cache.record_saving(hit.entry.cost_ms - (time.perf_counter() - started) * 1000)
+                cached = cached_response(hit)
+                yield sse_event("sources", {"sources": cached["sources"], "citations": cached["citations"]})
+                yield sse_event("token", {"text": cached["response"]})
+                yield sse_event("done", cached)
+                return
+
+        yield sse_event("status", {"message": "Searching the knowledge base..."})
+        chunks = await query_chroma(question, top_k)
+        if not chunks:
+            yield sse_event("token", {"text": NO_RESULTS_RESPONSE})
+            yield sse_event("done", {"response": NO_RESULTS_RESPONSE})
+            return
+
+        packed = context_packer.pack(chunks)
+        citations = [{"label": block.label, "chunk_ids": block.chunk_ids} for block in packed.blocks]
+        yield sse_event("sources", {"sources": chunks, "citations": citations})
+        yield sse_event("status", {"message": "Generating answer..."})
+
+        parts = []
+        async for token in rag_chain.astream({"question": question, "context": packed.text}):
+            if token:
+                if not parts:
+                    print(f"First token after {(time.perf_counter() - started) * 1000:.0f} ms")
+                parts.append(token)
+                yield sse_event("token", {"text": token})
+
+        response = "".join(parts)
+        if answer_cache:
+            answer_cache.store(question, embedding, top_k, response, chunks,
+                               cost_ms=(time.perf_counter() - started) * 1000,
+                               citations=citations, context_tokens=packed.tokens)
+        yield sse_event("done", {"response": response, "citations": citations, "context_tokens": packed.tokens})
+    except Exception as e:
+        print(f"Error in stream_answer: {str(e)}")
+        yield sse_event("error", {"detail": f"Error processing request: {str(e)}"})
+
+@app.post("/search/stream")
+async def rag_tool_search_stream(input: QueryInput):
+    """Like /search, but streams the answer as server-sent events while it is generated."""
+    print(f"Received streaming search query: {input.question}")
+    return StreamingResponse(
+        stream_answer(input.question, input.top_k),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/search:batch")
+async def rag_tool_search_batch(input: BatchQueryInput):
+    """Answer several questions in one call.
+
+    All questions are embedded in one model call and retrieved with one
+    multi-query Chroma lookup; cache misses are then generated concurrently,
+    at most RAG_BATCH_CONCURRENCY at a time. ``results`` follows the order of
+    ``questions``; a failed item carries ``error`` instead of ``response``.
+    """
+    questions = input.questions
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(questions) > RAG_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {RAG_BATCH_MAX_QUESTIONS} questions per batch")
+    print(f"Received batch of {len(questions)} questions")
+    started = time.perf_counter()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+
+    # 1. Embed every question in one forward pass, then serve cache hits
+    embed = answer_cache.embed if answer_cache else getattr(retriever, "embedding_function", None)
+    try:
+        vectors = await asyncio.to_thread(embed, questions) if embed else None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error embedding questions: {str(e)}")
+    pending, hits = [], []
+    for i, question in enumerate(questions):
+        if answer_cache:
+            hit = answer_cache.lookup(unit_vector(vectors[i]), input.top_k)
+            if hit:
+                results[i] = cached_response(hit)
+                hits.append(hit)
+                continue
+        pending.append(i)
+    for hit in hits:
+        # The embedding and lookup time is shared by every question in the batch
+        answer_cache.record_saving(hit.entry.cost_ms - (time.perf_counter() - started) * 1000 / len(questions))
+
+    # 2. One multi-query lookup for the misses
+    if pending:
+        try:
+            chunk_lists = await retriever.search_many(
+                [questions[i] for i in pending], input.top_k,
+                embeddings=[vectors[i] for i in pending] if vectors is not None else None,
+            )
+        except RetrievalError as e:
+            chunk_lists = [e] * len(pending)
+
+    # 3. Generate the answers concurrently under the cap
+    slots = asyncio.Semaphore(RAG_BATCH_CONCURRENCY)
+
+    async def answer(i: int, chunks):
+        item_started = time.perf_counter()
+        if isinstance(chunks, Exception):
+            results[i] = {"error": f"Retrieval failed: {str(chunks)}"}
+            return
+        if not chunks:
+            results[i] = {"response": NO_RESULTS_RESPONSE}
+            return
+        try:
+            async with slots:
+                results[i] = await generate_answer(questions[i], chunks)
+        except Exception as e:
+            print(f"Error answering batch question {i}: {str(e)}")
+            results[i] = {"error": f"Error processing request: {str(e)}"}
+            return
+        if answer_cache:
+            answer_cache.store(questions[i], unit_vector(vectors[i]), input.top_k, results[i]["response"], chunks,
+                               cost_ms=(time.perf_counter() - item_started) * 1000,
+                               citations=results[i]["citations"], context_tokens=results[i]["context_tokens"])
+
+    if pending:
+        await asyncio.gather(*(answer(i, chunks) for i, chunks in zip(pending, chunk_lists)))
+    print(f"✓ Batch answered ({len(hits)} from the semantic cache)")
+
+    return {
+        "count": len(questions),
+        "cached": len(hits),
+        "errors": sum(1 for result in results if "error" in result),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": [dict(result, index=i, question=questions[i]) for i, result in enumerate(results)],
+    }
+
 if __name__ == "__main__":
     import uvicorn
     host = "127.0.0.1"  # Changed from 0.0.0.0 to 127.0.0.1 for local access
@@ -108,6 +352,9 @@ if __name__ == "__main__":
     print("Endpoints:")
     print(f"  - Status:   http://{host}:{port}/chroma/status")
     print(f"  - Search:   http://{host}:{port}/search (POST)")
+    print(f"  - Batch:    http://{host}:{port}/search:batch (POST)")
+    print(f"  - Stream:   http://{host}:{port}/search/stream (POST, server-sent events)")
+    print(f"  - Cache:    http://{host}:{port}/cache/stats")
     print("="*50 + "\n")
 
     uvicorn.run(app, host=host, port=port, log_level="info")
@@ -0,0 +1,291 @@
+"""
+Retriever Module
+
+Chunk retrieval for rag_service, in one of two modes (RETRIEVAL_MODE):
+
+- ``http`` (default): queries the Chroma service over one lifespan-scoped
+  httpx.AsyncClient with keep-alive, per-phase timeouts and a retry budget,
+  so retries cannot multiply load on a struggling Chroma service.
+- ``embedded``: opens the persisted Chroma collection in-process and runs
+  queries on a small thread pool, removing the network hop altogether.
+
+Both return chunks as ``{"text", "metadata", "distance"}`` dicts, and both
+answer several queries at once with ``search_many``.
+"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CHROMA_SERVER = os.getenv("CHROMA_SERVER_HOST", "http://localhost:8000")
+CHROMA_QUERY_ENDPOINT = os.getenv("CHROMA_QUERY_ENDPOINT", f"{CHROMA_SERVER}/chroma/query")
+CHROMA_STATUS_ENDPOINT = os.getenv("CHROMA_STATUS_ENDPOINT", f"{CHROMA_SERVER}/chroma/status")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+
+class RetrievalError(Exception):
+    """Raised when chunks cannot be retrieved."""
+
+
+def load_embedding_function(model_name: str = EMBEDDING_MODEL):
+    """The sentence-transformers embedding function the Chroma index is built with."""
+    from chromadb.utils import embedding_functions
+
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+
+class RetryBudget:
+    """Allows retries only while they stay a small fraction of recent requests.
+
+    Every request deposits ``ratio`` tokens (up to ``max_tokens``) and every
+    retry spends one, so sustained failures degrade to single attempts.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class HTTPChromaRetriever:
+    """Queries the Chroma service through a pooled async HTTP client."""
+
+    mode = "http"
+
+    def __init__(
+        self,
+        query_endpoint: str = CHROMA_QUERY_ENDPOINT,
+        status_endpoint: str = CHROMA_STATUS_ENDPOINT,
+        timeout: float = None,
+        connect_timeout: float = None,
+        max_retries: int = None,
+        max_connections: int = None,
+    ):
+        """
+        Initialize the retriever. Call ``open()`` before use and ``close()`` on shutdown.
+
+        Args:
+            query_endpoint: Chroma service query URL
+            status_endpoint: Chroma service status URL
+            timeout: Seconds allowed to read a response (CHROMA_TIMEOUT)
+            connect_timeout: Seconds allowed to connect (CHROMA_CONNECT_TIMEOUT)
+            max_retries: Retries per query, subject to the retry budget (CHROMA_MAX_RETRIES)
+            max_connections: Connections kept to the Chroma service (CHROMA_MAX_CONNECTIONS)
+        """
+        self.query_endpoint = query_endpoint
+        self.status_endpoint = status_endpoint
+        self.timeout = timeout if timeout is not None else float(os.getenv("CHROMA_TIMEOUT", "5"))
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(os.getenv("CHROMA_CONNECT_TIMEOUT", "1"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("CHROMA_MAX_RETRIES", "2"))
+        self.max_connections = max_connections or int(os.getenv("CHROMA_MAX_CONNECTIONS", "20"))
+        self.budget = RetryBudget(ratio=float(os.getenv("CHROMA_RETRY_BUDGET_RATIO", "0.2")))
+        self.client = None
+        self._stats = {"requests": 0, "retries": 0, "budget_exhausted": 0, "errors": 0}
+
+    async def open(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            logger.info(f"HTTP retriever opened for {self.query_endpoint}")
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _get(self, url: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        self._stats["requests"] += 1
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.get(url, params=params)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            else:
+                if response.status_code < 400:
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        self._stats["errors"] += 1
+                        raise RetrievalError(f"Chroma service returned invalid JSON: {str(e)}") from e
+                if response.status_code < 500:
+                    # Retrying a rejected request will not help
+                    self._stats["errors"] += 1
+                    raise RetrievalError(f"Chroma service returned {response.status_code}")
+                error = f"status {response.status_code}"
+            if attempt >= self.max_retries:
+                break
+            if not self.budget.try_spend():
+                self._stats["budget_exhausted"] += 1
+                break
+            attempt += 1
+            self._stats["retries"] += 1
+            await asyncio.sleep(0.05 * 2 ** attempt)
+        self._stats["errors"] += 1
+        raise RetrievalError(f"Chroma service request failed: {error}")
+
+    async def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        data = await self._get(self.query_endpoint, {"q": query, "top_k": top_k})
+        return data.get("results", [])
+
+    async def search_many(self, queries: List[str], top_k: int = 3,
+                          embeddings: Sequence = None) -> List[Union[List[Dict[str, Any]], RetrievalError]]:
+        """Chunks per query, or the RetrievalError for a query that failed.
+
+        The Chroma service has no multi-query endpoint, so the queries run
+        concurrently over the shared client; ``embeddings`` is not used.
+        """
+        results = await asyncio.gather(*(self.search(query, top_k) for query in queries), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, RetrievalError):
+                raise result
+        return results
+
+    async def status(self) -> Dict[str, Any]:
+        return await self._get(self.status_endpoint)
+
+    async def index_version(self) -> Optional[str]:
+        """Version the Chroma service reports for its index; changes on every reindex."""
+        return (await self.status()).get("index_version")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats, mode=self.mode, retry_tokens=round(self.budget.tokens, 2))
+
+
+class EmbeddedChromaRetriever:
+    """Queries a persisted Chroma collection in-process on a thread pool."""
+
+    mode = "embedded"
+
+    def __init__(self, path: str = None, collection: str = None, embedding_model: str = None, workers: int = None):
+        """
+        Initialize the retriever. Call ``open()`` before use and ``close()`` on shutdown.
+
+        Args:
+            path: Chroma persist directory (CHROMA_PATH)
+            collection: Collection name (CHROMA_COLLECTION; "langchain" is what LangChain's Chroma writes)
+            embedding_model: Sentence-transformers model the collection was built with (EMBEDDING_MODEL)
+            workers: Threads running queries (CHROMA_QUERY_WORKERS)
+        """
+        self.path = path or os.getenv("CHROMA_PATH", "/app/chroma-data")
+        self.collection_name = collection or os.getenv("CHROMA_COLLECTION", "langchain")
+        self.embedding_model = embedding_model or EMBEDDING_MODEL
+        self.workers = workers or int(os.getenv("CHROMA_QUERY_WORKERS", "4"))
+        self.collection = None
+        self.embedding_function = None
+        self._client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"requests": 0, "errors": 0}
+
+    def _open_collection(self):
+        import chromadb
+
+        self._client = chromadb.PersistentClient(path=self.path)
+        self.embedding_function = load_embedding_function(self.embedding_model)
+        return self._client.get_collection(self.collection_name, embedding_function=self.embedding_function)
+
+    async def open(self):
+        if self.collection is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chroma")
+            loop = asyncio.get_running_loop()
+            # Loading the embedding model is slow; keep it off the event loop too
+            self.collection = await loop.run_in_executor(self._executor, self._open_collection)
+            logger.info(f"Embedded Chroma collection {self.collection_name!r} opened from {self.path} "
+                        f"({self.collection.count()} chunks)")
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.collection = None
+
+    def _query(self, queries: List[str], top_k: int, embeddings: Sequence = None) -> List[List[Dict[str, Any]]]:
+        include = ["documents", "metadatas", "distances"]
+        if embeddings is not None:
+            result = self.collection.query(query_embeddings=[list(map(float, vector)) for vector in embeddings],
+                                           n_results=top_k, include=include)
+        else:
+            result = self.collection.query(query_texts=queries, n_results=top_k, include=include)
+        chunks = []
+        for i, ids in enumerate(result["ids"]):
+            documents = result["documents"][i] if result.get("documents") else [""] * len(ids)
+            metadatas = result["metadatas"][i] if result.get("metadatas") else [None] * len(ids)
+            distances = result["distances"][i] if result.get("distances") else [None] * len(ids)
+            chunks.append([
+                {"id": chunk_id, "text": text, "metadata": metadata or {}, "distance": distance}
+                for chunk_id, text, metadata, distance in zip(ids, documents, metadatas, distances)
+            ])
+        return chunks
+
+    async def search_many(self, queries: List[str], top_k: int = 3,
+                          embeddings: Sequence = None) -> List[List[Dict[str, Any]]]:
+        """Chunks per query from a single collection query.
+
+        Pass ``embeddings`` (from the index's embedding function) when the
+        queries are already embedded, to skip embedding them again.
+        """
+        if self.collection is None:
+            raise RetrievalError("Embedded Chroma collection is not open")
+        self._stats["requests"] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._query, queries, top_k, embeddings
+            )
+        except Exception as e:
+            self._stats["errors"] += 1
+            raise RetrievalError(f"Embedded Chroma query failed: {str(e)}") from e
+
+    async def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        return (await self.search_many([query], top_k))[0]
+
+    async def status(self) -> Dict[str, Any]:
+        if self.collection is None:
+            return {"status": "Embedded collection not open", "mode": self.mode}
+        count = await asyncio.get_running_loop().run_in_executor(self._executor, self.collection.count)
+        return {"status": "ChromaDB is running", "mode": self.mode, "collection": self.collection_name, "chunks": count}
+
+    def _index_version(self) -> str:
+        # Re-read the collection so a rebuild by another process is noticed
+        collection = self._client.get_collection(self.collection_name, embedding_function=self.embedding_function)
+        return f"{collection.id}:{collection.count()}"
+
+    async def index_version(self) -> Optional[str]:
+        """Collection id and size; changes when the collection is rebuilt or extended."""
+        if self.collection is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._index_version)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats, mode=self.mode)
+
+
+def create_retriever(mode: str = None):
+    """Build the retriever for ``mode`` ("http" or "embedded"; defaults to RETRIEVAL_MODE)."""
+    mode = (mode or os.getenv("RETRIEVAL_MODE", "http")).lower()
+    if mode == "embedded":
+        return EmbeddedChromaRetriever()
+    if mode == "http":
+        return HTTPChromaRetriever()
+    raise ValueError(f"Unknown RETRIEVAL_MODE: {mode!r} (expected 'http' or 'embedded')")
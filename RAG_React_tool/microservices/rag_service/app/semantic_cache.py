@@ -0,0 +1,158 @@
+"""
+Semantic Cache Module
+
+Answer cache for rag_service ``/search``. Policy questions repeat with
+different wording ("what's the baggage limit?" / "how many kg can I check
+in?"), so entries are matched by the cosine similarity of question
+embeddings rather than by exact text. Each entry keeps the question
+embedding, the generated answer, the source chunks (with their IDs) and the
+citation labels and token count of the context the answer was built from.
+
+Entries expire after a TTL, the least recently used entry is evicted when
+the cache is full, and everything is dropped when the Chroma index version
+changes, since answers built from the old index may no longer hold.
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    question: str
+    embedding: np.ndarray  # unit length
+    top_k: int
+    answer: Any
+    sources: List[Dict[str, Any]]
+    source_ids: List[str]
+    citations: List[Dict[str, Any]]
+    context_tokens: Optional[int]
+    version: Optional[str]
+    cost_ms: float  # latency of the retrieval and generation this entry saves
+    stored_at: float
+
+
+class CacheHit(NamedTuple):
+    entry: CacheEntry
+    similarity: float
+
+
+def unit_vector(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """LRU/TTL cache of answers keyed by question embedding."""
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]], threshold: float = 0.92,
+                 max_entries: int = 1000, ttl: float = 3600.0):
+        """
+        Initialize the cache.
+
+        Args:
+            embed: Embeds a list of texts (e.g. a Chroma embedding function)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Seconds an entry stays valid
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._matrix: Optional[np.ndarray] = None  # stacked embeddings, rebuilt lazily
+        self._matrix_ids: List[int] = []
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0,
+                       "latency_saved_ms": 0.0}
+
+    async def aembed(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed ``texts`` off the event loop; returns unit vectors."""
+        vectors = await asyncio.to_thread(self.embed, texts)
+        return [unit_vector(vector) for vector in vectors]
+
+    def set_version(self, version: Optional[str]) -> bool:
+        """Record the current index version; returns True if that dropped the cache."""
+        with self._lock:
+            if version is None or version == self.version:
+                return False
+            changed = self.version is not None
+            self.version = version
+            if changed:
+                self._stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._matrix = None
+        if changed:
+            logger.info(f"Index version changed to {version}; semantic cache cleared")
+        return changed
+
+    def _expire(self, now: float):
+        stale = [key for key, entry in self._entries.items() if now - entry.stored_at > self.ttl]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._stats["expired"] += len(stale)
+            self._matrix = None
+
+    def lookup(self, embedding: np.ndarray, top_k: int) -> Optional[CacheHit]:
+        """Most similar live entry for the same ``top_k`` at or above the threshold."""
+        with self._lock:
+            self._expire(time.monotonic())
+            if self._matrix is None and self._entries:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([entry.embedding for entry in self._entries.values()])
+            best: Optional[CacheHit] = None
+            if self._matrix is not None:
+                similarities = self._matrix @ embedding
+                for index in np.argsort(-similarities):
+                    similarity = float(similarities[index])
+                    if similarity < self.threshold:
+                        break
+                    key = self._matrix_ids[index]
+                    entry = self._entries[key]
+                    if entry.top_k == top_k and entry.version == self.version:
+                        self._entries.move_to_end(key)
+                        best = CacheHit(entry, similarity)
+                        break
+            self._stats["hits" if best else "misses"] += 1
+            return best
+
+    def store(self, question: str, embedding: np.ndarray, top_k: int, answer: Any,
+              sources: List[Dict[str, Any]], cost_ms: float, citations: List[Dict[str, Any]] = None,
+              context_tokens: Optional[int] = None):
+        """Cache an answer generated for ``question`` with the citations of its packed context."""
+        source_ids = [str(source["id"]) for source in sources if isinstance(source, dict) and "id" in source]
+        with self._lock:
+            entry = CacheEntry(question, embedding, top_k, answer, sources, source_ids, citations or [],
+                               context_tokens, self.version, cost_ms, time.monotonic())
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._matrix = None
+
+    def record_saving(self, saved_ms: float):
+        """Add the latency a hit saved (the entry's cost minus the time the hit took)."""
+        with self._lock:
+            self._stats["latency_saved_ms"] += max(0.0, saved_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), index_version=self.version,
+                         threshold=self.threshold)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["latency_saved_ms"] = round(stats["latency_saved_ms"], 1)
+        stats["avg_saved_ms_per_hit"] = round(stats["latency_saved_ms"] / stats["hits"], 1) if stats["hits"] else 0.0
+        return stats
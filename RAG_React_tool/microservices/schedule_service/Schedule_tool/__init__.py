@@ -1,3 +1,8 @@
-from .sql_tool import SQLTool, get_sql_tool
+from .schedule_sql_tool import ScheduleSQLTool, get_schedule_sql_tool
+from .async_schedule_sql_tool import AsyncScheduleSQLTool, get_async_schedule_sql_tool
+from .schedule_index import ScheduleIndex
+from .itinerary_search import ItineraryPlanner
+from .schedule_listener import ScheduleChangeListener
 
-__all__ = ['SQLTool', 'get_sql_tool']
+__all__ = ['ScheduleSQLTool', 'get_schedule_sql_tool', 'AsyncScheduleSQLTool', 'get_async_schedule_sql_tool',
+           'ScheduleIndex', 'ItineraryPlanner', 'ScheduleChangeListener']
@@ -0,0 +1,92 @@
+import os
+import asyncpg
+from typing import Dict, Any, Optional
+import logging
+
+from .schedule_sql_tool import ScheduleSQLTool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncScheduleSQLTool(ScheduleSQLTool):
+    """Async variant of ScheduleSQLTool: generates SQL with ``ainvoke`` and runs it on an asyncpg pool."""
+
+    def __init__(self, model_name: str = None, temperature: float = None):
+        """Initialize the async SQL tool. Call ``open()`` before use and ``close()`` on shutdown.
+
+        Args:
+            model_name: Name of the model to use for SQL generation
+            temperature: Temperature for the model
+        """
+        super().__init__(model_name=model_name, temperature=temperature)
+        self.pool: Optional[asyncpg.Pool] = None
+
+    async def open(self):
+        """Create the connection pool (sized from PG_POOL_MIN_SIZE / PG_POOL_MAX_SIZE)."""
+        if self.pool is not None:
+            return
+        self.pool = await asyncpg.create_pool(
+            database=self.pg_db,
+            user=self.pg_user,
+            password=self.pg_password,
+            host=self.pg_host,
+            port=int(self.pg_port),
+            min_size=int(os.environ.get("PG_POOL_MIN_SIZE", 1)),
+            max_size=int(os.environ.get("PG_POOL_MAX_SIZE", 10)),
+            server_settings={"statement_timeout": os.environ.get("PG_STATEMENT_TIMEOUT_MS", "5000")},
+        )
+        logger.info("Async Postgres pool opened for ScheduleSQLTool")
+
+    async def close(self):
+        """Close the connection pool."""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def aexecute_query(self, query: str) -> str:
+        """Execute a SQL query on the pool and return the results."""
+        if self.pool is None:
+            await self.open()
+        try:
+            async with self.pool.acquire() as conn:
+                if query.strip().upper().startswith(('SELECT', 'WITH')):
+                    records = await conn.fetch(query)
+                    columns = list(records[0].keys()) if records else []
+                    return self._format_results(columns, [tuple(record) for record in records])
+                await conn.execute(query)
+                return "Query executed successfully."
+        except asyncpg.PostgresError as e:
+            return f"Error executing query: {str(e)}"
+
+    async def acall(self, request: str) -> str:
+        """Process a natural language request without blocking the event loop."""
+        try:
+            # Generate the SQL query
+            sql_query = self._clean_sql_query(await self.schedule_sql_chain.ainvoke(request))
+
+            # Execute the query
+            result = await self.aexecute_query(sql_query)
+            return self._format_response(request, sql_query, result)
+
+        except Exception as e:
+            return f"Error processing request: {str(e)}"
+
+
+def get_async_schedule_sql_tool() -> Dict[str, Any]:
+    """Create and return the async schedule SQL tool configuration for the ReAct agent."""
+    schedule_sql_tool = AsyncScheduleSQLTool()
+
+    return {
+        "name": "sql_query",
+        "description": """Use this tool to query flight schedule information in the database.
+        It can be used to:
+        - Check flight details
+        - View flight schedule
+        - Get information about flights schedules
+
+        """,
+        "func": schedule_sql_tool.__call__,
+        "coroutine": schedule_sql_tool.acall,
+        "tool": schedule_sql_tool,
+        "return_direct": False
+    }
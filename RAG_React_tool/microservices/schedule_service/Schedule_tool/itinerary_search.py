@@ -0,0 +1,250 @@
+"""
+Itinerary Search Module
+
+Connecting-flight search over the schedule index. Flights form a route
+graph between cities; an itinerary is a chain of flights where each leg
+leaves at least the minimum connection time after the previous one lands,
+within a maximum layover, on a day the flight actually operates (overnight
+layovers roll the day forward). Itineraries are explored best-first by
+total travel time, from the first departure to the final arrival, so the
+first ``limit`` found are the ``limit`` fastest.
+
+Results are cached per (origin, destination, day, search options). A
+status or delay change drops only the cached itineraries that use the
+flight; any other change to the index drops the whole cache.
+"""
+import os
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .schedule_index import DAY_NAMES, Flight, ScheduleIndex, ScheduleSnapshot, city_key, day_mask, format_minutes
+
+logger = logging.getLogger(__name__)
+
+MIN_CONNECTION_MINUTES = int(os.getenv("MIN_CONNECTION_MINUTES", "60"))
+MAX_LAYOVER_MINUTES = int(os.getenv("MAX_LAYOVER_MINUTES", str(12 * 60)))
+MAX_ITINERARY_LEGS = int(os.getenv("MAX_ITINERARY_LEGS", "3"))
+ITINERARY_CACHE_SIZE = int(os.getenv("ITINERARY_CACHE_SIZE", "512"))
+
+DAY_MINUTES = 24 * 60
+
+
+class Leg(NamedTuple):
+    """One flight of an itinerary, timed relative to midnight of the travel day."""
+    flight: Flight
+    departs: int  # minutes after midnight of the first leg's day
+    arrives: int
+
+
+class Itinerary(NamedTuple):
+    legs: Tuple[Leg, ...]
+
+    @property
+    def total_minutes(self) -> int:
+        return self.legs[-1].arrives - self.legs[0].departs
+
+    def to_dict(self, day: Optional[int] = None) -> Dict[str, Any]:
+        """JSON-ready form; ``day`` (0 = Monday) names the weekday of each leg."""
+        legs = []
+        for i, leg in enumerate(self.legs):
+            offset = leg.departs // DAY_MINUTES
+            entry = {
+                "flight_id": leg.flight.flight_id,
+                "airline": leg.flight.record.get("airline"),
+                "from_city": leg.flight.from_city,
+                "to_city": leg.flight.to_city,
+                "departure": format_minutes(leg.departs % DAY_MINUTES),
+                "arrival": format_minutes(leg.arrives % DAY_MINUTES),
+                "day_offset": offset,
+            }
+            if day is not None:
+                entry["day"] = DAY_NAMES[(day + offset) % 7].capitalize()
+            if i:
+                entry["layover_minutes"] = leg.departs - self.legs[i - 1].arrives
+            legs.append(entry)
+        return {
+            "total_minutes": self.total_minutes,
+            "total_time": format_minutes(self.total_minutes),
+            "stops": len(self.legs) - 1,
+            "legs": legs,
+        }
+
+
+def _operates(flight: Flight, day: Optional[int], offset: int) -> bool:
+    return day is None or bool(flight.days & (1 << ((day + offset) % 7)))
+
+
+def _next_departure(flight: Flight, ready: int, day: Optional[int]) -> Optional[int]:
+    """Earliest departure of ``flight`` at or after ``ready`` (minutes from the travel day's
+    midnight) on a day it operates, or None if it does not operate within a week."""
+    offset = ready // DAY_MINUTES
+    if offset * DAY_MINUTES + flight.departure < ready:
+        offset += 1
+    for _ in range(7):
+        if _operates(flight, day, offset):
+            return offset * DAY_MINUTES + flight.departure
+        offset += 1
+    return None
+
+
+class ItineraryPlanner:
+    """Finds the fastest direct and connecting itineraries in a ScheduleIndex."""
+
+    def __init__(
+        self,
+        index: ScheduleIndex,
+        min_connection: int = MIN_CONNECTION_MINUTES,
+        max_layover: int = MAX_LAYOVER_MINUTES,
+        max_legs: int = MAX_ITINERARY_LEGS,
+        cache_size: int = ITINERARY_CACHE_SIZE,
+    ):
+        """
+        Initialize the planner.
+
+        Args:
+            index: Schedule index to search
+            min_connection: Default minimum minutes between landing and the next departure
+            max_layover: Default maximum minutes between landing and the next departure
+            max_legs: Default maximum flights per itinerary
+            cache_size: Number of searches kept in the result cache
+        """
+        self.index = index
+        self.min_connection = min_connection
+        self.max_layover = max_layover
+        self.max_legs = max_legs
+        self.cache_size = cache_size
+        self._snapshot: Optional[ScheduleSnapshot] = None
+        self._departures: Dict[str, List[Flight]] = {}
+        self._cache: "OrderedDict[tuple, List[Itinerary]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        index.subscribe(self.invalidate)
+
+    def invalidate(self, flight_ids=None):
+        """Drop cached itineraries using any of ``flight_ids``, or all of them for None."""
+        with self._lock:
+            if flight_ids is None:
+                dropped = len(self._cache)
+                self._cache.clear()
+            else:
+                stale = [
+                    key for key, itineraries in self._cache.items()
+                    if any(leg.flight.flight_id in flight_ids for itinerary in itineraries for leg in itinerary.legs)
+                ]
+                for key in stale:
+                    del self._cache[key]
+                dropped = len(stale)
+            self._stats["invalidations"] += dropped
+
+    def _graph(self) -> Dict[str, List[Flight]]:
+        """Departures per origin city for the current snapshot."""
+        snapshot = self.index.snapshot
+        if snapshot is None:
+            raise RuntimeError("Schedule index has not been loaded")
+        with self._lock:
+            if snapshot is not self._snapshot:
+                departures: Dict[str, List[Flight]] = {}
+                for (origin, _), route in snapshot.by_city.items():
+                    departures.setdefault(origin, []).extend(route.flights)
+                self._departures = departures
+                self._snapshot = snapshot
+            return self._departures
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        day: Any = None,
+        limit: int = 5,
+        max_legs: int = None,
+        min_connection: int = None,
+        max_layover: int = None,
+    ) -> List[Itinerary]:
+        """Return up to ``limit`` itineraries from ``origin`` to ``destination``, fastest first.
+
+        Args:
+            origin: Departure city
+            destination: Arrival city
+            day: Travel day (day name or ISO date) the first leg must operate on;
+                None ignores day-of-week validity
+            limit: Number of itineraries to return
+            max_legs: Maximum flights per itinerary
+            min_connection: Minimum minutes between landing and the next departure
+            max_layover: Maximum minutes between landing and the next departure
+
+        Raises:
+            ValueError: If ``day`` cannot be parsed
+            RuntimeError: If the index has not been loaded yet
+        """
+        graph = self._graph()
+        day_index = day_mask(day).bit_length() - 1 if day not in (None, "") else None
+        max_legs = max_legs or self.max_legs
+        min_connection = self.min_connection if min_connection is None else min_connection
+        max_layover = self.max_layover if max_layover is None else max_layover
+        key = (city_key(origin), city_key(destination), day_index, limit, max_legs,
+               min_connection, max_layover)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return cached
+            self._stats["misses"] += 1
+
+        snapshot = self._snapshot
+        result = self._search(graph, key[0], key[1], day_index, limit, max_legs, min_connection, max_layover)
+        with self._lock:
+            if self.index.snapshot is not snapshot:
+                # The index changed mid-search; the answer may already be stale
+                return result
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _search(graph, origin, destination, day, limit, max_legs, min_connection, max_layover) -> List[Itinerary]:
+        found: List[Itinerary] = []
+        if origin == destination:
+            return found
+        # Heap of (total minutes so far, tie-breaker, legs); extending an itinerary never
+        # shortens it, so itineraries reach the destination in order of total time
+        heap: List[Tuple[int, int, Tuple[Leg, ...]]] = []
+        counter = 0
+        for flight in graph.get(origin, []):
+            if _operates(flight, day, 0):
+                leg = Leg(flight, flight.departure, flight.departure + flight.duration)
+                heapq.heappush(heap, (flight.duration, counter, (leg,)))
+                counter += 1
+
+        while heap and len(found) < limit:
+            total, _, legs = heapq.heappop(heap)
+            last = legs[-1]
+            city = city_key(last.flight.to_city)
+            if city == destination:
+                found.append(Itinerary(legs))
+                continue
+            if len(legs) >= max_legs:
+                continue
+            visited = {city_key(leg.flight.from_city) for leg in legs}
+            for flight in graph.get(city, []):
+                if city_key(flight.to_city) in visited:
+                    continue
+                departs = _next_departure(flight, last.arrives + min_connection, day)
+                if departs is None or departs - last.arrives > max_layover:
+                    continue
+                leg = Leg(flight, departs, departs + flight.duration)
+                heapq.heappush(heap, (leg.arrives - legs[0].departs, counter, legs + (leg,)))
+                counter += 1
+        return found
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, cached_searches=len(self._cache))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,401 @@
+"""
+Schedule Index Module
+
+An in-memory index over the flight schedule table. The table is small and
+read-mostly, so the service keeps all of it in memory:
+
+- flights by flight ID;
+- departures by (from_city, to_city) and by (from_airport_code,
+  to_airport_code), sorted by departure time so a time window is a bisect;
+- the free-text "Departure days of week" column parsed into a 7-bit mask
+  (Monday = bit 0), so a day filter is a single AND.
+
+A reload builds a complete new snapshot and swaps it in with one reference
+assignment, so searches never see a half-built index. Single-row changes
+(e.g. pushed by the schedule_changes NOTIFY trigger) are applied the same
+way, and subscribers are told which flights changed so they can drop only
+the cached answers that involve them.
+"""
+import os
+import re
+import time
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_TABLE = os.getenv("SCHEDULE_TABLE", "Flight_availability_and_schedule")
+
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+ALL_DAYS = (1 << 7) - 1
+WEEKDAYS = (1 << 5) - 1
+WEEKENDS = ALL_DAYS & ~WEEKDAYS
+
+_DAY_WORDS = {
+    "daily": ALL_DAYS, "everyday": ALL_DAYS, "all": ALL_DAYS,
+    "weekday": WEEKDAYS, "weekdays": WEEKDAYS,
+    "weekend": WEEKENDS, "weekends": WEEKENDS,
+}
+_DAY_TOKEN = re.compile(r"[a-z]+")
+
+
+def _day_index(token: str) -> Optional[int]:
+    """Map "fri", "Friday", "FRI." to 4; None if the token is not a day name."""
+    token = token.lower()
+    if len(token) < 2:
+        return None
+    for i, name in enumerate(DAY_NAMES):
+        if name.startswith(token[:3]) and name.startswith(token[:len(name)]):
+            return i
+    return None
+
+
+_EXCEPT = re.compile(r"^(?:(?:daily|everyday|all\s+days)\s*,?\s*)?(?:except|excluding|but\s+not|not|no)(?:\s+on)?\b\s*(.*)$")
+# A negation anywhere else ("Mon-Fri but not Wed") is not understood
+_NEGATION = re.compile(r"\b(?:except|excluding|not|no)\b")
+
+
+def _parse_day_list(value: str) -> int:
+    """Mask for a lower-cased list of days, words and ranges; 0 if none were recognised."""
+    mask = 0
+    for part in re.split(r"[,/;&]|\band\b", value):
+        part = part.strip()
+        if not part:
+            continue
+        if part in _DAY_WORDS:
+            mask |= _DAY_WORDS[part]
+            continue
+        bounds = [_day_index(token) for token in re.split(r"\s*(?:-|–|to)\s*", part) if token]
+        if len(bounds) == 2 and None not in bounds:
+            start, end = bounds
+            for offset in range((end - start) % 7 + 1):
+                mask |= 1 << ((start + offset) % 7)
+            continue
+        for token in _DAY_TOKEN.findall(part):
+            index = _day_index(token)
+            if index is not None:
+                mask |= 1 << index
+    return mask
+
+
+def parse_days(text: Any) -> int:
+    """Parse a "Departure days of week" value into a bitmask (Monday = bit 0).
+
+    Understands "Daily", "Weekdays", "Weekends", lists ("Mon, Wed, Fri"),
+    ranges ("Mon-Fri") and leading exclusions ("Except Sunday", "Not on
+    Sundays", "Daily except on Sat, Sun"). Unparseable values count as daily,
+    so a flight is never silently hidden by a formatting quirk.
+
+    Raises:
+        ValueError: If the value negates days in a form not understood, since
+            reading it as a plain list would invert its meaning
+    """
+    value = str(text or "").strip().lower()
+    if not value:
+        return ALL_DAYS
+    if value in _DAY_WORDS:
+        return _DAY_WORDS[value]
+
+    excluded = _EXCEPT.match(value)
+    if not excluded and _NEGATION.search(value):
+        raise ValueError(f"Unsupported departure days {text!r}")
+    mask = _parse_day_list(excluded.group(1) if excluded else value)
+    if excluded and mask:
+        mask = ALL_DAYS & ~mask
+    if not mask:
+        logger.warning(f"Unrecognised departure days {text!r}; treating the flight as daily")
+        return ALL_DAYS
+    return mask
+
+
+def day_mask(day: Any) -> int:
+    """Mask for a single requested day: a day name ("fri", "Friday") or an ISO date."""
+    if isinstance(day, (date, datetime)):
+        return 1 << day.weekday()
+    value = str(day).strip()
+    try:
+        return 1 << date.fromisoformat(value).weekday()
+    except ValueError:
+        pass
+    index = _day_index(value)
+    if index is None:
+        raise ValueError(f"Unrecognised day {day!r}")
+    return 1 << index
+
+
+def parse_minutes(value: Any) -> Optional[int]:
+    """Minutes after midnight for "6:00", "18:30", "6pm", "6:30 PM" or a time/timedelta."""
+    if value is None:
+        return None
+    if isinstance(value, (dt_time, datetime)):
+        return value.hour * 60 + value.minute
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60) % (24 * 60)
+    match = re.fullmatch(r"\s*(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*([ap]\.?m\.?)?\s*", str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Unrecognised time {value!r}")
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        hours = hours % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"Unrecognised time {value!r}")
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (dt_time, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return format_minutes(parse_minutes(value))
+    if isinstance(value, Decimal):
+        return float(value)
+    return value.strip() if isinstance(value, str) else value
+
+
+# Former and colloquial city names users still ask for
+CITY_ALIASES = {
+    "bangalore": "bengaluru", "bombay": "mumbai", "calcutta": "kolkata",
+    "madras": "chennai", "cochin": "kochi", "new delhi": "delhi", "poona": "pune",
+}
+
+
+def city_key(value: Any) -> str:
+    """Normalized lookup key for a city name."""
+    key = " ".join(str(value or "").lower().split())
+    return CITY_ALIASES.get(key, key)
+
+
+def _key(value: Any) -> str:
+    return str(value or "").strip().lower()
+
+
+class Flight(NamedTuple):
+    """One scheduled flight, with the fields the index searches on pre-parsed."""
+    flight_id: str
+    from_city: str
+    to_city: str
+    from_airport_code: str
+    to_airport_code: str
+    departure: int  # minutes after midnight
+    arrival: int  # minutes after midnight (may be earlier than departure for overnight flights)
+    duration: int  # minutes
+    days: int  # bitmask, Monday = bit 0
+    record: Dict[str, Any]  # the row, JSON-ready, keyed by lower-cased column name
+
+
+def build_flight(row: Dict[str, Any]) -> Flight:
+    """Build a Flight from a schedule row. Column names are matched case-insensitively, so
+    both the service table ("Flight_ID", "Departure_days_of_week") and the SQLite
+    layout ("flight_id", "departure_days") work."""
+    record = {key.lower(): _jsonable(value) for key, value in row.items()}
+    departure = parse_minutes(record["departure_time"])
+    duration_hours = record.get("flight_duration")
+    arrival = parse_minutes(record["arrival_time"]) if record.get("arrival_time") else None
+    if duration_hours not in (None, ""):
+        duration = int(round(float(duration_hours) * 60))
+    else:
+        duration = (arrival - departure) % (24 * 60)
+    if arrival is None:
+        arrival = (departure + duration) % (24 * 60)
+    days_text = record.get("departure_days_of_week", record.get("departure_days"))
+    return Flight(
+        flight_id=str(record["flight_id"]).strip().upper(),
+        from_city=record.get("from_city") or "",
+        to_city=record.get("to_city") or "",
+        from_airport_code=(record.get("from_airport_code") or "").upper(),
+        to_airport_code=(record.get("to_airport_code") or "").upper(),
+        departure=departure,
+        arrival=arrival,
+        duration=duration,
+        days=parse_days(days_text),
+        record=record,
+    )
+
+
+def _routing(flight: Flight) -> tuple:
+    """The fields that decide where and when a flight goes (everything but status/delay etc.)."""
+    return (flight.from_city, flight.to_city, flight.from_airport_code, flight.to_airport_code,
+            flight.departure, flight.arrival, flight.duration, flight.days)
+
+
+class _Departures(NamedTuple):
+    """Flights on one route, sorted by departure, with the departure times for bisecting."""
+    times: List[int]
+    flights: List[Flight]
+
+
+class ScheduleSnapshot:
+    """An immutable, fully built index over one load of the schedule."""
+
+    def __init__(self, flights: Iterable[Flight]):
+        self.loaded_at = time.time()
+        self.by_id: Dict[str, Flight] = {}
+        by_city: Dict[Tuple[str, str], List[Flight]] = {}
+        by_airport: Dict[Tuple[str, str], List[Flight]] = {}
+        for flight in flights:
+            self.by_id[flight.flight_id] = flight
+            by_city.setdefault((city_key(flight.from_city), city_key(flight.to_city)), []).append(flight)
+            by_airport.setdefault((flight.from_airport_code, flight.to_airport_code), []).append(flight)
+        self.by_city = {route: self._sorted(flights) for route, flights in by_city.items()}
+        self.by_airport = {route: self._sorted(flights) for route, flights in by_airport.items()}
+
+    @staticmethod
+    def _sorted(flights: List[Flight]) -> _Departures:
+        flights = sorted(flights, key=lambda flight: (flight.departure, flight.flight_id))
+        return _Departures([flight.departure for flight in flights], flights)
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+class ScheduleIndex:
+    """The service's schedule index; ``rebuild`` swaps in a new snapshot atomically."""
+
+    def __init__(self, table: str = SCHEDULE_TABLE):
+        self.table = table
+        self._snapshot: Optional[ScheduleSnapshot] = None
+        self._subscribers: List[Callable[[Optional[Set[str]]], None]] = []
+
+    def subscribe(self, callback: Callable[[Optional[Set[str]]], None]):
+        """Call ``callback`` after every swap with the changed flight IDs, or None when
+        anything may have changed (a reload, or a change to a flight's route or times)."""
+        self._subscribers.append(callback)
+
+    def _swap(self, snapshot: ScheduleSnapshot, changed: Optional[Set[str]]):
+        # A single reference assignment: readers see either the old or the new index
+        self._snapshot = snapshot
+        for callback in self._subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Schedule index subscriber failed: {str(e)}")
+
+    @property
+    def snapshot(self) -> Optional[ScheduleSnapshot]:
+        return self._snapshot
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Build a new snapshot from schedule rows and swap it in. Rows that cannot be
+        parsed are skipped. Returns the number of flights indexed."""
+        flights = []
+        for row in rows:
+            try:
+                flights.append(build_flight(row))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping schedule row {row.get('Flight_ID', row.get('flight_id'))!r}: {str(e)}")
+        snapshot = ScheduleSnapshot(flights)
+        self._swap(snapshot, None)
+        logger.info(f"Schedule index rebuilt with {len(snapshot)} flights")
+        return len(snapshot)
+
+    def apply_change(self, op: str, row: Dict[str, Any]) -> Optional[Set[str]]:
+        """Apply one INSERT/UPDATE/DELETE of a schedule row and swap in the result.
+
+        Returns the changed flight IDs, or None if the change can affect
+        routing (a new, removed or retimed flight), i.e. everything.
+
+        Raises:
+            KeyError, TypeError, ValueError: If the row cannot be parsed
+            RuntimeError: If the index has not been loaded yet
+        """
+        snapshot = self._require()
+        flight = build_flight(row)
+        flights = dict(snapshot.by_id)
+        previous = flights.pop(flight.flight_id, None)
+        if op.upper() != "DELETE":
+            flights[flight.flight_id] = flight
+        if op.upper() == "DELETE" or previous is None or _routing(previous) != _routing(flight):
+            changed = None
+        else:
+            # e.g. a status or delay update: only answers mentioning this flight are stale
+            changed = {flight.flight_id}
+        self._swap(ScheduleSnapshot(flights.values()), changed)
+        return changed
+
+    async def reload(self, pool) -> int:
+        """Re-read the schedule table from an asyncpg pool and rebuild the index."""
+        async with pool.acquire() as conn:
+            records = await conn.fetch(f'SELECT * FROM "{self.table}"')
+        return self.rebuild(dict(record) for record in records)
+
+    def get(self, flight_id: str) -> Optional[Flight]:
+        snapshot = self._require()
+        return snapshot.by_id.get(flight_id.strip().upper())
+
+    def _require(self) -> ScheduleSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("Schedule index has not been loaded")
+        return snapshot
+
+    def search(
+        self,
+        from_city: Optional[str] = None,
+        to_city: Optional[str] = None,
+        from_airport: Optional[str] = None,
+        to_airport: Optional[str] = None,
+        day: Any = None,
+        depart_after: Any = None,
+        depart_before: Any = None,
+        limit: int = 50,
+    ) -> List[Flight]:
+        """Find flights by route, optionally on one day and within a departure window.
+
+        The route is given by cities, by airport codes, or by either end only
+        (e.g. every departure from DEL). Results are ordered by departure time.
+
+        Raises:
+            ValueError: If ``day`` or a departure bound cannot be parsed
+            RuntimeError: If the index has not been loaded yet
+        """
+        snapshot = self._require()
+        mask = day_mask(day) if day not in (None, "") else ALL_DAYS
+        low = parse_minutes(depart_after) if depart_after not in (None, "") else 0
+        high = parse_minutes(depart_before) if depart_before not in (None, "") else 24 * 60 - 1
+
+        if from_airport or to_airport:
+            index, origin, destination = snapshot.by_airport, _key(from_airport).upper(), _key(to_airport).upper()
+        else:
+            index, origin, destination = snapshot.by_city, city_key(from_city), city_key(to_city)
+
+        if origin and destination:
+            routes = [index.get((origin, destination))]
+        else:
+            routes = [
+                departures for (start, end), departures in index.items()
+                if (not origin or start == origin) and (not destination or end == destination)
+            ]
+
+        matches: List[Flight] = []
+        for departures in routes:
+            if departures is None:
+                continue
+            start = bisect_left(departures.times, low)
+            end = bisect_right(departures.times, high)
+            matches.extend(flight for flight in departures.flights[start:end] if flight.days & mask)
+        if len(routes) > 1:
+            matches.sort(key=lambda flight: (flight.departure, flight.flight_id))
+        return matches[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"loaded": False, "flights": 0}
+        return {
+            "loaded": True,
+            "flights": len(snapshot),
+            "city_routes": len(snapshot.by_city),
+            "airport_routes": len(snapshot.by_airport),
+            "loaded_at": snapshot.loaded_at,
+        }
@@ -0,0 +1,129 @@
+"""
+Schedule Listener Module
+
+Keeps the schedule index current without polling. The ``schedule_changes``
+trigger (database migration 5) sends a NOTIFY carrying the changed row for
+every insert, update or delete on the schedule table. ScheduleChangeListener
+holds one dedicated LISTEN connection and applies each change to the index
+as it arrives, which in turn flushes the cached answers it affects.
+
+The latency from the change in Postgres to the index swap is tracked as a
+metric. If the connection drops, the listener reconnects and reloads the
+whole table, since notifications sent while it was away are lost.
+"""
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+
+import asyncpg
+
+from .schedule_index import ScheduleIndex
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "schedule_changes"
+
+
+class ScheduleChangeListener:
+    """Applies schedule_changes notifications to a ScheduleIndex."""
+
+    def __init__(self, index: ScheduleIndex, pool: asyncpg.Pool, connect_kwargs: Dict[str, Any],
+                 channel: str = CHANNEL, retry_delay: float = 5.0, window: int = 1000):
+        """
+        Initialize the listener.
+
+        Args:
+            index: Index to keep current
+            pool: Pool used to reload the whole table after a reconnect
+            connect_kwargs: ``asyncpg.connect`` arguments for the dedicated LISTEN connection
+            channel: NOTIFY channel to listen on
+            retry_delay: Seconds between reconnection attempts
+            window: Number of recent latencies kept for the percentiles
+        """
+        self.index = index
+        self.pool = pool
+        self.connect_kwargs = connect_kwargs
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._latencies = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"received": 0, "applied": 0, "ignored": 0, "errors": 0, "reconnects": 0}
+        self.connected = False
+
+    def _on_notify(self, conn, pid, channel, payload: str):
+        self._stats["received"] += 1
+        try:
+            event = json.loads(payload)
+            if event.get("table") != self.index.table:
+                self._stats["ignored"] += 1
+                return
+            changed = self.index.apply_change(event["op"], event["row"])
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"Could not apply schedule change {payload[:200]!r}: {str(e)}")
+            return
+        self._stats["applied"] += 1
+        if event.get("ts") is not None:
+            self._latencies.append(max(0.0, (time.time() - float(event["ts"])) * 1000))
+        logger.info(f"Applied schedule {event['op']} ({'all' if changed is None else ', '.join(sorted(changed))})")
+
+    async def _listen_once(self, reload: bool):
+        conn = await asyncpg.connect(**self.connect_kwargs)
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _: closed.set())
+        try:
+            await conn.add_listener(self.channel, self._on_notify)
+            self.connected = True
+            logger.info(f"Listening for {self.channel} notifications")
+            if reload:
+                # Notifications sent while disconnected are gone; reload once LISTEN is active
+                self._stats["reconnects"] += 1
+                await self.index.reload(self.pool)
+            await closed.wait()
+        finally:
+            self.connected = False
+            if not conn.is_closed():
+                await conn.close()
+
+    async def _run(self):
+        reload = not self.index.loaded
+        while True:
+            try:
+                await self._listen_once(reload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Schedule change listener failed: {str(e)}")
+            reload = True
+            await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        """Start listening in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop listening and close the dedicated connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Notification counters and invalidation latency (ms, change to index swap)."""
+        stats = dict(self._stats, connected=self.connected)
+        latencies = sorted(self._latencies)
+        if latencies:
+            stats["latency_ms"] = {
+                "last": round(self._latencies[-1], 2),
+                "p50": round(latencies[len(latencies) // 2], 2),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "max": round(latencies[-1], 2),
+            }
+        return stats
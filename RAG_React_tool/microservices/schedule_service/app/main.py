@@ -1,11 +1,44 @@
 # sql-tool/main.py
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from Schedule_tool.schedule_sql_tool import get_schedule_sql_tool
+from Schedule_tool.async_schedule_sql_tool import AsyncScheduleSQLTool
+from Schedule_tool.schedule_index import ScheduleIndex, day_mask, format_minutes
+from Schedule_tool.itinerary_search import ItineraryPlanner
+from Schedule_tool.schedule_listener import ScheduleChangeListener
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
-schedule_sql_tool_func = get_schedule_sql_tool()["func"]
+schedule_sql_tool = AsyncScheduleSQLTool()
+schedule_index = ScheduleIndex()
+itinerary_planner = ItineraryPlanner(schedule_index)
+schedule_listener: Optional[ScheduleChangeListener] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global schedule_listener
+    await schedule_sql_tool.open()
+    try:
+        await schedule_index.reload(schedule_sql_tool.pool)
+    except Exception as e:
+        # /query still works without the index; /schedules/search answers 503 until a reload succeeds
+        logger.error(f"Failed to load the schedule index: {str(e)}")
+    # Status/delay changes are pushed by the schedule_changes trigger instead of polled
+    schedule_listener = ScheduleChangeListener(
+        schedule_index,
+        schedule_sql_tool.pool,
+        dict(database=schedule_sql_tool.pg_db, user=schedule_sql_tool.pg_user,
+             password=schedule_sql_tool.pg_password, host=schedule_sql_tool.pg_host,
+             port=int(schedule_sql_tool.pg_port)),
+    )
+    schedule_listener.start()
+    yield
+    await schedule_listener.stop()
+    await schedule_sql_tool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 class QueryInput(BaseModel):
     question: str
@@ -13,11 +46,106 @@ class QueryInput(BaseModel):
 @app.post("/query")
 async def schedule_sql_tool_query(input: QueryInput):
     try:
-        response = schedule_sql_tool_func(input.question)
+        response = await schedule_sql_tool.acall(input.question)
         return {"response": response}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/schedules/search")
+async def search_schedules(
+    from_city: Optional[str] = None,
+    to_city: Optional[str] = None,
+    from_airport: Optional[str] = None,
+    to_airport: Optional[str] = None,
+    day: Optional[str] = None,
+    depart_after: Optional[str] = None,
+    depart_before: Optional[str] = None,
+    limit: int = 50,
+):
+    """Structured schedule search served from the in-memory index, e.g.
+    ``/schedules/search?from_city=Delhi&to_city=Mumbai&day=friday&depart_after=18:00``.
+
+    ``day`` is a day name or an ISO date; departure bounds accept "18:00" or "6pm".
+    """
+    if not schedule_index.loaded:
+        raise HTTPException(status_code=503, detail="Schedule index is not loaded")
+    try:
+        flights = schedule_index.search(
+            from_city=from_city,
+            to_city=to_city,
+            from_airport=from_airport,
+            to_airport=to_airport,
+            day=day,
+            depart_after=depart_after,
+            depart_before=depart_before,
+            limit=max(1, min(limit, 500)),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "count": len(flights),
+        "flights": [
+            dict(flight.record, departure=format_minutes(flight.departure), arrival=format_minutes(flight.arrival))
+            for flight in flights
+        ],
+    }
+
+@app.get("/schedules/connections")
+async def search_connections(
+    from_city: str,
+    to_city: str,
+    day: Optional[str] = None,
+    limit: int = 5,
+    max_legs: Optional[int] = None,
+    min_connection: Optional[int] = None,
+    max_layover: Optional[int] = None,
+):
+    """Fastest direct and connecting itineraries between two cities, e.g.
+    ``/schedules/connections?from_city=Bengaluru&to_city=Kolkata&day=friday``.
+
+    Connections honour the minimum connection time and maximum layover (minutes)
+    and each leg's days of operation; results are cached per search.
+    """
+    if not schedule_index.loaded:
+        raise HTTPException(status_code=503, detail="Schedule index is not loaded")
+    try:
+        itineraries = itinerary_planner.search(
+            from_city,
+            to_city,
+            day=day,
+            limit=max(1, min(limit, 20)),
+            max_legs=max(1, min(max_legs, 4)) if max_legs else None,
+            min_connection=min_connection,
+            max_layover=max_layover,
+        )
+        day_index = day_mask(day).bit_length() - 1 if day else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "count": len(itineraries),
+        "itineraries": [itinerary.to_dict(day_index) for itinerary in itineraries],
+    }
+
+@app.post("/schedules/reload")
+async def reload_schedules():
+    """Re-read the schedule table and atomically swap in a rebuilt index."""
+    try:
+        count = await schedule_index.reload(schedule_sql_tool.pool)
+    except Exception as e:
+        logger.error(f"Schedule index reload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Reload failed: {str(e)}")
+    return {"flights": count, **schedule_index.get_stats()}
+
+@app.get("/schedules/stats")
+async def schedule_stats():
+    """Index size, itinerary cache counters and change-notification metrics,
+    including the invalidation latency from a change in Postgres to the index swap."""
+    return {
+        "index": schedule_index.get_stats(),
+        "itinerary_cache": itinerary_planner.get_stats(),
+        "listener": schedule_listener.get_stats() if schedule_listener else None,
+    }
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8003)